@@ -11,9 +11,13 @@ import subprocess
 import re
 import platform
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from user_agents import parse
 from config import CONFIG, logger
-from models import get_db_session, User, UserSession
+from sqlalchemy import text
+from models import engine, get_db_session, User, UserSession
+from token_cache import get_token_cache
 
 SECRET_KEY = CONFIG.get("JWT_SECRET_KEY", os.urandom(32).hex())  # Use random key if not set
 ALGORITHM = "HS256"
@@ -24,6 +28,9 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt is deliberately slow; it runs on this bounded pool (bcrypt releases the GIL)
+# so logins never block the event loop and at most PASSWORD_HASH_WORKERS run at once.
+password_executor = ThreadPoolExecutor(max_workers=CONFIG["PASSWORD_HASH_WORKERS"], thread_name_prefix="password")
 
 def create_standard_response(status_str: str, message: str, data: Dict[str, Any] = None) -> Dict[str, Any]:
     try:
@@ -52,7 +59,20 @@ def create_access_token(data: dict) -> tuple[str, datetime]:
             detail="Unable to process the request. Please try again later."
         )
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db_session)) -> dict:
+def get_db():
+    """Request-scoped session. FastAPI caches dependencies per request, so get_current_user
+    and the endpoint share one session that is closed when the response is done."""
+    db = get_db_session()
+    try:
+        yield db
+    finally:
+        try:
+            db.close()
+            logger.info("Database session closed successfully")
+        except Exception as e:
+            logger.error(f"Failed to close database session: {e}", exc_info=True)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> dict:
     logger.info(f"Validating token: {token[:10]}...")
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,6 +92,15 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError as e:
         logger.error(f"Token decoding failed: {e}")
         raise credentials_exception
+    token_cache = get_token_cache()
+    if token_cache is not None:
+        try:
+            cached_user = token_cache.get(token)
+        except Exception as e:
+            logger.warning(f"Token cache lookup failed, falling back to the database: {e}")
+            cached_user = None
+        if cached_user is not None and cached_user["id"] == user_id:
+            return cached_user
     try:
         session = db.query(UserSession).filter(
             UserSession.user_id == user_id,
@@ -91,28 +120,25 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             logger.error(f"Session expired for user_id: {user_id}, expires_at: {expires_at}")
             session.status = "expired"
             db.commit()
+            if token_cache is not None:
+                token_cache.delete(token)
             raise credentials_exception
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
             logger.error(f"User not found for user_id: {user_id}")
             raise credentials_exception
         logger.info(f"User authenticated: {user.username}, role: {user.role}")
-        return {"id": user.id, "username": user.username, "role": user.role}
+        current_user = {"id": user.id, "username": user.username, "role": user.role}
+        if token_cache is not None:
+            try:
+                token_cache.set(token, current_user, expires_at)
+            except Exception as e:
+                logger.warning(f"Failed to cache token for user_id {user_id}: {e}")
+        return current_user
     except Exception as e:
         logger.error(f"User authentication failed for user_id {user_id}: {e}", exc_info=True)
         raise credentials_exception
 
-def get_db():
-    db = get_db_session()
-    try:
-        yield db
-    finally:
-        try:
-            db.close()
-            logger.info("Database session closed successfully")
-        except Exception as e:
-            logger.error(f"Failed to close database session: {e}", exc_info=True)
-
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
         return pwd_context.verify(plain_password, hashed_password)
@@ -130,6 +156,12 @@ def get_password_hash(password: str) -> str:
             detail="Unable to process the request. Please try again later."
         )
 
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(password_executor, verify_password, plain_password, hashed_password)
+
+async def aget_password_hash(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(password_executor, get_password_hash, password)
+
 def get_mac_from_ip(ip: str) -> str:
     try:
         if platform.system() == 'Windows':
@@ -178,10 +210,12 @@ def get_mac_address() -> List[str]:
         return []
 
 def get_system_info(request: Request) -> Dict[str, Any]:
+    return get_client_system_info(request.client.host if request.client else "Unknown", request.headers.get("user-agent", ""))
+
+def get_client_system_info(client_ip: str, user_agent_string: str) -> Dict[str, Any]:
+    """Enrich a login with MAC, OS/browser/device and host details; slow (runs `arp -a`), so call it off the request path."""
     try:
-        user_agent_string = request.headers.get("user-agent", "")
         user_agent = parse(user_agent_string)
-        client_ip = request.client.host
         client_mac = get_mac_from_ip(client_ip)
         mac_addresses = get_mac_address()
         os_info = f"{user_agent.os.family} {user_agent.os.version_string}"
@@ -203,39 +237,41 @@ def get_system_info(request: Request) -> Dict[str, Any]:
     except Exception as e:
         logger.error(f"Failed to retrieve system info: {e}", exc_info=True)
         return {
-            "client_ip": "Unknown",
+            "client_ip": client_ip,
             "client_mac": None,
             "mac_addresses": [],
             "os_info": "Unknown",
             "browser": "Unknown",
             "device": "Unknown",
-            "user_agent": "Unknown",
+            "user_agent": user_agent_string or "Unknown",
             "memory_gb": 0.0,
             "cpu_cores": 0,
         }
 
 def migrate_sessions():
     """
-    Migrate existing UserSession records to ensure expires_at is timezone-aware.
-    Converts offset-naive expires_at values to offset-aware with Asia/Kolkata timezone.
+    One-shot migration of UserSession timestamps to timezone-aware storage, done in SQL.
+    Postgres columns created as `timestamp without time zone` are converted in place,
+    reading the stored values as Asia/Kolkata time. SQLite has no timezone-aware type:
+    values are stored as Asia/Kolkata local time and get_current_user attaches the
+    zone when reading, so no rows need rewriting.
     """
     try:
-        db = get_db_session()
-        sessions = db.query(UserSession).all()
-        updated_count = 0
-        for session in sessions:
-            if session.expires_at and session.expires_at.tzinfo is None:
-                session.expires_at = session.expires_at.replace(tzinfo=ZoneInfo("Asia/Kolkata"))
-                updated_count += 1
-        db.commit()
-        logger.info(f"Successfully migrated {updated_count} UserSession expires_at to timezone-aware")
+        if engine.dialect.name != "postgresql":
+            logger.info(f"Session timestamp migration not needed for {engine.dialect.name}")
+            return
+        with engine.begin() as conn:
+            naive_columns = conn.execute(text(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_name = 'sessions' AND column_name IN ('created_at', 'expires_at') "
+                "AND data_type = 'timestamp without time zone'"
+            )).scalars().all()
+            for column in naive_columns:
+                conn.execute(text(
+                    f"ALTER TABLE sessions ALTER COLUMN {column} TYPE timestamptz "
+                    f"USING {column} AT TIME ZONE 'Asia/Kolkata'"
+                ))
+        logger.info(f"Migrated session columns to timezone-aware: {naive_columns or 'none needed'}")
     except Exception as e:
         logger.error(f"Failed to migrate sessions: {e}", exc_info=True)
-        db.rollback()
         raise RuntimeError("Session migration failed")
-    finally:
-        try:
-            db.close()
-            logger.info("Database session closed successfully after migration")
-        except Exception as e:
-            logger.error(f"Failed to close database session after migration: {e}", exc_info=True)
\ No newline at end of file
@@ -1,30 +1,36 @@
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import os
+import json
 import shutil
 import uuid
 from config import CONFIG, logger
-from database import DatabaseManager
-from doc_query import DocumentQuery
-from document_processor import DocumentProcessor
-from db_query import DatabaseQuery
-from llm_agent import QueryAgent
+from query_services import query_services
 from models import ChatHistory, Documents
+from write_behind import audit_queue
+from session_sweeper import session_sweeper
+from ingestion_queue import ingestion_queue
+from embedding_cache import get_embedding_cache
+from token_cache import get_token_cache
+from http_transport import http_transport
 from api_utils import create_standard_response, get_db, get_current_user
-from schema import StandardResponse, QueryRequest, QueryResponse, DatabaseQueryResponse, DocumentUploadResponse
+from schema import StandardResponse, QueryRequest, QueryResponse, DatabaseQueryResponse, DocumentUploadResponse, IngestionJobResponse
 
 api_router = APIRouter(prefix="/api", tags=["api"])
 
 @api_router.get("/connect", response_model=StandardResponse)
-async def connect_db(current_user: dict = Depends(get_current_user)):
-    """Connect to the database and return its schema (requires authentication)."""
+async def connect_db(refresh: bool = False, current_user: dict = Depends(get_current_user)):
+    """Connect to the database and return its schema; refresh=true reflects the tables again (requires authentication)."""
     try:
         print(f'postgres db {CONFIG["DB_URI"]}')
-        db_manager = DatabaseManager(CONFIG["DB_URI"])
-        db_manager.connect()
-        schema = db_manager.get_schema()
+        db_manager = await run_in_threadpool(query_services.db_manager)
+        if refresh:
+            await run_in_threadpool(db_manager.refresh)
+        schema = await run_in_threadpool(db_manager.get_schema)
         logger.info(f"Database connected for user: {current_user['username']}")
         return create_standard_response(
             "success",
@@ -46,7 +52,7 @@ async def upload_document(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Upload a document and process it for the user's role (requires authentication)."""
+    """Upload a document and queue it for ingestion into the user's role index (requires authentication)."""
     try:
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(
@@ -81,13 +87,12 @@ async def upload_document(
         )
         db.add(upload_record)
         db.commit()
-        doc_processor = DocumentProcessor(os.path.join(CONFIG["ROOT_DIR"], "dataset", "pdfs"), role)
-        doc_processor.process_documents()
-        logger.info(f"Document uploaded and processed: {file.filename} for role {role} by user {current_user['username']}")
+        job_id = ingestion_queue.submit(role, file.filename, current_user["id"])
+        logger.info(f"Document uploaded and queued for processing: {file.filename} for role {role} by user {current_user['username']}")
         return create_standard_response(
             "success",
-            f"Document {file.filename} uploaded and processed successfully for role {role}.",
-            DocumentUploadResponse(filename=file.filename, role=role, timestamp=upload_record.timestamp).dict()
+            f"Document {file.filename} uploaded for role {role}. Processing has been queued.",
+            DocumentUploadResponse(filename=file.filename, role=role, timestamp=upload_record.timestamp, job_id=job_id).dict()
         )
     except HTTPException:
         raise
@@ -98,11 +103,25 @@ async def upload_document(
             detail="Failed to process document upload. Please try again later."
         )
 
+@api_router.get("/documents/jobs/{job_id}", response_model=StandardResponse)
+async def document_job_status(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Return the status of a document ingestion job (requires authentication)."""
+    job = ingestion_queue.get(job_id)
+    if not job or job["role"] != current_user["role"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ingestion job not found."
+        )
+    return create_standard_response(
+        "success",
+        f"Ingestion job is {job['status']}.",
+        IngestionJobResponse(**job).dict()
+    )
+
 @api_router.post("/query", response_model=StandardResponse)
 async def agent_query(
     request: QueryRequest,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: dict = Depends(get_current_user)
 ):
     """Execute an agent query combining database and document data (requires authentication)."""
     try:
@@ -111,29 +130,20 @@ async def agent_query(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Query cannot be empty."
             )
-        role = current_user["role"]
-        doc_processor = DocumentProcessor(os.path.join(CONFIG["ROOT_DIR"], "dataset", "pdfs"), role)
-        vector_store = doc_processor.process_documents()
-        print(f'postgres db {CONFIG["DB_URI"]}')
-        db_manager = DatabaseManager(CONFIG["DB_URI"])
-        db_manager.connect()
-        agent = QueryAgent(db_manager, vector_store)
+        agent = await run_in_threadpool(query_services.agent, current_user["role"])
         start_time = datetime.now(ZoneInfo("Asia/Kolkata"))
-        response = agent.execute_query(request.query)
+        response = await agent.aexecute_query(request.query)
         query_processing_time = (datetime.now(ZoneInfo("Asia/Kolkata")) - start_time).total_seconds()
         response_id = str(uuid.uuid4())
-        db.add(
-            ChatHistory(
-                user_id=current_user["id"],
-                query=request.query,
-                response=response,
-                response_id=response_id,
-                query_type="agent",
-                query_processing_time=query_processing_time,
-                chat_timestamp=datetime.now(ZoneInfo("Asia/Kolkata")),
-            )
-        )
-        db.commit()
+        await audit_queue.aput(ChatHistory, {
+            "user_id": current_user["id"],
+            "query": request.query,
+            "response": response,
+            "response_id": response_id,
+            "query_type": "agent",
+            "query_processing_time": query_processing_time,
+            "chat_timestamp": datetime.now(ZoneInfo("Asia/Kolkata"))
+        })
         logger.info(f"Agent query executed by user {current_user['username']}: {request.query}")
         return create_standard_response(
             "success",
@@ -149,11 +159,69 @@ async def agent_query(
             detail="Failed to process query. Please try again later."
         )
 
+def _sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+async def _stream_and_record(events, current_user: dict, query: str, query_type: str):
+    """Relay query events as server-sent events and persist the full response to ChatHistory at the end."""
+    start_time = datetime.now(ZoneInfo("Asia/Kolkata"))
+    response = None
+    try:
+        async for event in events:
+            if event["event"] == "done":
+                response = event["data"]["response"]
+                continue
+            yield _sse(event)
+    except Exception as e:
+        logger.error(f"Streaming {query_type} query failed for user {current_user['username']}: {str(e)}", exc_info=True)
+        yield _sse({"event": "error", "data": {"detail": "Failed to process query. Please try again later."}})
+        return
+    query_processing_time = (datetime.now(ZoneInfo("Asia/Kolkata")) - start_time).total_seconds()
+    response_id = str(uuid.uuid4())
+    try:
+        await audit_queue.aput(ChatHistory, {
+            "user_id": current_user["id"],
+            "query": query,
+            "response": response or "",
+            "response_id": response_id,
+            "query_type": query_type,
+            "query_processing_time": query_processing_time,
+            "chat_timestamp": datetime.now(ZoneInfo("Asia/Kolkata"))
+        })
+    except Exception as e:
+        logger.error(f"Failed to record streamed {query_type} query for user {current_user['username']}: {str(e)}", exc_info=True)
+    logger.info(f"Streamed {query_type} query executed by user {current_user['username']}: {query}")
+    yield _sse({"event": "done", "data": {"response_id": response_id, "query": query, "response": response}})
+
+@api_router.post("/query/stream")
+async def agent_query_stream(
+    request: QueryRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream an agent query as server-sent events: node progress, answer tokens, then "done" (requires authentication)."""
+    if not request.query.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query cannot be empty."
+        )
+    try:
+        agent = await run_in_threadpool(query_services.agent, current_user["role"])
+    except Exception as e:
+        logger.error(f"Agent query stream setup failed for user {current_user['username']}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to process query. Please try again later."
+        )
+    return StreamingResponse(
+        _stream_and_record(agent.astream_query(request.query), current_user, request.query, "agent"),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.post("/documents/query", response_model=StandardResponse)
 async def doc_query(
     request: QueryRequest,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: dict = Depends(get_current_user)
 ):
     """Execute a query on documents for the user's role (requires authentication)."""
     try:
@@ -162,26 +230,20 @@ async def doc_query(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Query cannot be empty."
             )
-        role = current_user["role"]
-        doc_processor = DocumentProcessor(os.path.join(CONFIG["ROOT_DIR"], "dataset", "pdfs"), role)
-        vector_store = doc_processor.process_documents()
-        doc_query_handler = DocumentQuery(vector_store)
+        doc_query_handler = await run_in_threadpool(query_services.document_query, current_user["role"])
         start_time = datetime.now(ZoneInfo("Asia/Kolkata"))
-        response = doc_query_handler.execute_query(request.query)
+        response = await doc_query_handler.aexecute_query(request.query)
         query_processing_time = (datetime.now(ZoneInfo("Asia/Kolkata")) - start_time).total_seconds()
         response_id = str(uuid.uuid4())
-        db.add(
-            ChatHistory(
-                user_id=current_user["id"],
-                query=request.query,
-                response=response,
-                response_id=response_id,
-                query_type="doc",
-                query_processing_time=query_processing_time,
-                chat_timestamp=datetime.now(ZoneInfo("Asia/Kolkata")),
-            )
-        )
-        db.commit()
+        await audit_queue.aput(ChatHistory, {
+            "user_id": current_user["id"],
+            "query": request.query,
+            "response": response,
+            "response_id": response_id,
+            "query_type": "doc",
+            "query_processing_time": query_processing_time,
+            "chat_timestamp": datetime.now(ZoneInfo("Asia/Kolkata"))
+        })
         logger.info(f"Document query executed by user {current_user['username']}: {request.query}")
         return create_standard_response(
             "success",
@@ -197,11 +259,35 @@ async def doc_query(
             detail="Failed to process document query. Please try again later."
         )
 
+@api_router.post("/documents/query/stream")
+async def doc_query_stream(
+    request: QueryRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream a document query as server-sent events (requires authentication)."""
+    if not request.query.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query cannot be empty."
+        )
+    try:
+        doc_query_handler = await run_in_threadpool(query_services.document_query, current_user["role"])
+    except Exception as e:
+        logger.error(f"Document query stream setup failed for user {current_user['username']}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to process document query. Please try again later."
+        )
+    return StreamingResponse(
+        _stream_and_record(doc_query_handler.astream_query(request.query), current_user, request.query, "doc"),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.post("/db/query", response_model=StandardResponse)
 async def db_query(
     request: QueryRequest,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: dict = Depends(get_current_user)
 ):
     """Execute a database query (requires authentication)."""
     try:
@@ -210,25 +296,20 @@ async def db_query(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Query cannot be empty."
             )
-        db_manager = DatabaseManager(CONFIG["DB_URI"])
-        db_manager.connect()
-        db_query_handler = DatabaseQuery(db_manager)
+        db_query_handler = await run_in_threadpool(query_services.database_query)
         start_time = datetime.now(ZoneInfo("Asia/Kolkata"))
-        result = db_query_handler.execute_query(request.query)
+        result = await db_query_handler.aexecute_query(request.query)
         query_processing_time = (datetime.now(ZoneInfo("Asia/Kolkata")) - start_time).total_seconds()
         response_id = str(uuid.uuid4())
-        db.add(
-            ChatHistory(
-                user_id=current_user["id"],
-                query=request.query,
-                response=result["natural_language_response"],
-                response_id=response_id,
-                query_type="db",
-                query_processing_time=query_processing_time,
-                chat_timestamp=datetime.now(ZoneInfo("Asia/Kolkata")),
-            )
-        )
-        db.commit()
+        await audit_queue.aput(ChatHistory, {
+            "user_id": current_user["id"],
+            "query": request.query,
+            "response": result["natural_language_response"],
+            "response_id": response_id,
+            "query_type": "db",
+            "query_processing_time": query_processing_time,
+            "chat_timestamp": datetime.now(ZoneInfo("Asia/Kolkata"))
+        })
         logger.info(f"Database query executed by user {current_user['username']}: {request.query}")
         return create_standard_response(
             "success",
@@ -246,4 +327,30 @@ async def db_query(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to process database query. Please try again later."
+        )
+
+@api_router.get("/metrics", response_model=StandardResponse)
+async def metrics(current_user: dict = Depends(get_current_user)):
+    """Return runtime performance counters (requires authentication)."""
+    try:
+        cache = get_embedding_cache()
+        token_cache = get_token_cache()
+        return create_standard_response(
+            "success",
+            "Metrics retrieved successfully.",
+            {
+                "embedding_cache": cache.stats() if cache else None,
+                "ingestion_queue": ingestion_queue.stats(),
+                "http": http_transport.stats(),
+                "database": query_services.stats(),
+                "token_cache": token_cache.stats() if token_cache else None,
+                "audit_queue": audit_queue.stats(),
+                "session_sweeper": session_sweeper.stats(),
+            }
+        )
+    except Exception as e:
+        logger.error(f"Metrics retrieval failed for user {current_user['username']}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve metrics. Please try again later."
         )
\ No newline at end of file
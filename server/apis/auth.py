@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import datetime
@@ -6,19 +6,40 @@ from zoneinfo import ZoneInfo
 import os
 from config import CONFIG, logger
 from models import User, UserSession, UserLog
+from write_behind import audit_queue
 from api_utils import (
     create_access_token,
     create_standard_response,
     get_db,
-    get_password_hash,
+    aget_password_hash,
     get_current_user,
-    verify_password,
-    get_system_info
+    averify_password,
+    get_client_system_info
 )
+from token_cache import get_token_cache
 from schema import StandardResponse, Token, UserModel
 
 auth_router = APIRouter(prefix="/api", tags=["auth"])
 
+def record_login(user_id: int, client_ip: str, user_agent: str, login_timestamp: datetime):
+    """Background task: enrich a login with system information and queue it as a UserLog row."""
+    system_info = get_client_system_info(client_ip, user_agent)
+    try:
+        audit_queue.put(UserLog, {
+            "user_id": user_id,
+            "client_ip": system_info["client_ip"],
+            "mac_address": system_info["client_mac"],
+            "os_info": system_info["os_info"],
+            "browser": system_info["browser"],
+            "device": system_info["device"],
+            "user_agent": system_info["user_agent"],
+            "memory_gb": system_info["memory_gb"],
+            "cpu_cores": system_info["cpu_cores"],
+            "login_timestamp": login_timestamp
+        })
+    except Exception as e:
+        logger.error(f"Failed to record login for user_id {user_id}: {str(e)}", exc_info=True)
+
 @auth_router.post("/signup", response_model=StandardResponse)
 async def signup(user: UserModel, db: Session = Depends(get_db)):
     """Register a new user with a unique username and email."""
@@ -38,7 +59,7 @@ async def signup(user: UserModel, db: Session = Depends(get_db)):
                 status_code=status.HTTP_409_CONFLICT,
                 detail="This email is already registered. Please use a different email or log in."
             )
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await aget_password_hash(user.password)
         db_user = User(
             email=user.email,
             name=user.name,
@@ -62,14 +83,15 @@ async def signup(user: UserModel, db: Session = Depends(get_db)):
 
 @auth_router.post("/login", response_model=StandardResponse)
 async def login(
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
     request: Request = None,
     db: Session = Depends(get_db)
 ):
-    """Authenticate a user and create a session with system information."""
+    """Authenticate a user and create a session; system information is logged after the response."""
     try:
         user = db.query(User).filter(User.username == form_data.username).first()
-        if not user or not verify_password(form_data.password, user.password):
+        if not user or not await averify_password(form_data.password, user.password):
             logger.error(f"Login attempt failed for username: {form_data.username}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -87,21 +109,14 @@ async def login(
             status="active",
         )
         db.add(db_session)
-        system_info = get_system_info(request)
-        user_log = UserLog(
-            user_id=user.id,
-            client_ip=system_info["client_ip"],
-            mac_address=system_info["client_mac"],
-            os_info=system_info["os_info"],
-            browser=system_info["browser"],
-            device=system_info["device"],
-            user_agent=system_info["user_agent"],
-            memory_gb=system_info["memory_gb"],
-            cpu_cores=system_info["cpu_cores"],
-            login_timestamp=datetime.now(ZoneInfo("Asia/Kolkata"))
-        )
-        db.add(user_log)
         db.commit()
+        background_tasks.add_task(
+            record_login,
+            user.id,
+            request.client.host if request.client else "Unknown",
+            request.headers.get("user-agent", ""),
+            datetime.now(ZoneInfo("Asia/Kolkata"))
+        )
         logger.info(f"User logged in: {user.username}, token: {access_token[:10]}...")
         return create_standard_response(
             "success",
@@ -126,6 +141,9 @@ async def logout(current_user: dict = Depends(get_current_user), db: Session = D
             UserSession.status == "active"
         ).update({"status": "expired"})
         db.commit()
+        token_cache = get_token_cache()
+        if token_cache is not None:
+            token_cache.revoke_user(current_user["id"])
         logger.info(f"User logged out: {current_user['username']}, {updated_count} sessions expired")
         return create_standard_response("success", "You have been logged out successfully.")
     except HTTPException:
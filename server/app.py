@@ -5,11 +5,15 @@ from api_utils import create_standard_response
 from apis.api import api_router
 from apis.auth import auth_router
 from config import CONFIG, logger
-from document_processor import DocumentProcessor
-from models import Documents, get_db_session, UserSession
+from vector_store_registry import vector_store_registry
+from ingestion_queue import ingestion_queue
+from http_transport import http_transport
+from query_services import query_services
+from write_behind import audit_queue
+from session_sweeper import session_sweeper
+from models import Documents, get_db_session, init_db
 from datetime import datetime
 from zoneinfo import ZoneInfo
-import os
 from contextlib import asynccontextmanager
 from api_utils import migrate_sessions
 app = FastAPI(title="SCM Chatbot API")
@@ -28,17 +32,16 @@ app.include_router(auth_router)
 app.include_router(api_router)
 
 @asynccontextmanager
-async def startup_event():
-    """Initialize the application by cleaning up expired sessions and processing default documents."""
+async def startup_event(app: FastAPI):
+    """Initialize the application by cleaning up expired sessions and processing default documents,
+    and drain background workers on shutdown."""
+    init_db()
     db = get_db_session()
     migrate_sessions()
     try:
-        # Clean up expired sessions
-        expired_count = db.query(UserSession).filter(
-            UserSession.expires_at < datetime.now(ZoneInfo("Asia/Kolkata"))
-        ).update({"status": "expired"})
-        db.commit()
-        logger.info(f"Cleaned up {expired_count} expired sessions during startup.")
+        # Clean up expired sessions; the sweeper repeats this periodically afterwards
+        swept = session_sweeper.sweep_once()
+        logger.info(f"Cleaned up {swept['expired']} expired sessions during startup ({swept['purged']} purged).")
 
         # Process default documents for all roles
         failed_roles = []
@@ -52,8 +55,7 @@ async def startup_event():
                         timestamp=datetime.now(ZoneInfo("Asia/Kolkata"))
                     ))
                 db.commit()
-                doc_processor = DocumentProcessor(os.path.join(CONFIG["ROOT_DIR"], "dataset", "pdfs"), role)
-                doc_processor.process_documents()
+                vector_store_registry.refresh(role)
                 logger.info(f"Processed default documents for role: {role}")
             except Exception as e:
                 logger.error(f"Failed to process documents for role {role}: {str(e)}", exc_info=True)
@@ -64,6 +66,11 @@ async def startup_event():
         else:
             logger.info("Successfully processed all default documents for all roles.")
 
+        try:
+            query_services.warm_up()
+        except Exception as e:
+            logger.error(f"Failed to warm up query services: {str(e)}", exc_info=True)
+
         # Log non-sensitive configuration
         safe_config = {k: v for k, v in CONFIG.items() if k not in ["JWT_SECRET_KEY", "GROQ_API_KEY", "ANTHROPIC_API_KEY"]}
         logger.info(f"Application started with configuration: {safe_config}")
@@ -77,4 +84,13 @@ async def startup_event():
         except Exception as e:
             logger.error(f"Failed to close database session: {str(e)}", exc_info=True)
 
-app.lifespan = startup_event
\ No newline at end of file
+    session_sweeper.start()
+    yield
+
+    await session_sweeper.stop()
+    ingestion_queue.shutdown()
+    audit_queue.shutdown()
+    await http_transport.aclose()
+    logger.info("Application shutdown completed")
+
+app.router.lifespan_context = startup_event
\ No newline at end of file
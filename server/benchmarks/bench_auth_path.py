@@ -0,0 +1,93 @@
+"""Measure the database overhead of authenticating one request, before and after the shared engine.
+
+"before" reproduces the old get_db_session(): a new engine plus create_all() for both
+get_current_user and get_db. "after" uses one pooled engine and a single
+request-scoped session. Both run the session and user lookups of get_current_user
+against a throwaway SQLite file.
+
+Run from the server folder:
+    python benchmarks/bench_auth_path.py --requests 500
+"""
+import os
+import sys
+import time
+import uuid
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Base, User, UserSession, create_user_db_engine
+
+def seed(url: str) -> tuple[int, str]:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    user = User(email="bench@example.com", name="Bench", username="bench", password="x", role="admin")
+    db.add(user)
+    db.commit()
+    token = uuid.uuid4().hex
+    db.add(UserSession(session_id=uuid.uuid4().hex, user_id=user.id, token=token,
+                       expires_at=datetime.now(ZoneInfo("Asia/Kolkata")) + timedelta(hours=1)))
+    db.commit()
+    user_id = user.id
+    db.close()
+    engine.dispose()
+    return user_id, token
+
+def authenticate(db, user_id: int, token: str):
+    session = db.query(UserSession).filter(
+        UserSession.user_id == user_id,
+        UserSession.token == token,
+        UserSession.status == "active"
+    ).first()
+    return db.query(User).filter(User.id == session.user_id).first()
+
+def legacy_session(url: str):
+    engine = create_engine(url, echo=False)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+def run_before(url: str, user_id: int, token: str) -> float:
+    start = time.perf_counter()
+    auth_db = legacy_session(url)
+    request_db = legacy_session(url)
+    authenticate(auth_db, user_id, token)
+    request_db.close()
+    auth_db.close()
+    return time.perf_counter() - start
+
+def run_after(session_factory, user_id: int, token: str) -> float:
+    start = time.perf_counter()
+    db = session_factory()
+    authenticate(db, user_id, token)
+    db.close()
+    return time.perf_counter() - start
+
+def report(name: str, samples: list):
+    ms = np.array(samples) * 1000
+    print(f"{name:<7} mean {ms.mean():8.3f} ms   p50 {np.percentile(ms, 50):8.3f} ms   p99 {np.percentile(ms, 99):8.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Auth-path database overhead benchmark.")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        url = f"sqlite:///{os.path.join(folder, 'users.db')}"
+        user_id, token = seed(url)
+        before = [run_before(url, user_id, token) for _ in range(args.requests)]
+        session_factory = sessionmaker(bind=create_user_db_engine(url))
+        after = [run_after(session_factory, user_id, token) for _ in range(args.requests)]
+    print(f"{args.requests} authenticated requests")
+    report("before", before)
+    report("after", after)
+    print(f"speedup {np.mean(before) / np.mean(after):.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare FAISS index types against the flat baseline: recall@k, p50/p99 search latency and memory.
+
+Vectors come from an existing role index in processed_docs (no embedding calls are made).
+Larger corpora are synthesised by jittering those vectors.
+
+Run from the server folder:
+    python benchmarks/bench_index_types.py --role admin --scales 1 10 100 \
+        --factories Flat HNSW32 IVF256,PQ32 --nprobe 16 --ef-search 64
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import CONFIG
+from index_factory import build_index, apply_search_params
+
+def load_corpus_vectors(role: str) -> np.ndarray:
+    index = faiss.read_index(os.path.join(CONFIG["PROCESSED_DOCS_DIR"], f"faiss_index_{role}", "index.faiss"))
+    return index.reconstruct_n(0, index.ntotal).astype("float32")
+
+def scale_corpus(base: np.ndarray, factor: int, rng: np.random.Generator) -> np.ndarray:
+    """Grow the corpus by adding jittered copies of the real vectors, preserving their distribution."""
+    if factor <= 1:
+        return base
+    noise = base.std() * 0.05
+    copies = [base] + [base + rng.normal(0, noise, base.shape).astype("float32") for _ in range(factor - 1)]
+    return np.vstack(copies)
+
+def measure(index: faiss.Index, queries: np.ndarray, k: int):
+    latencies = []
+    results = np.empty((len(queries), k), dtype="int64")
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results[i] = ids[0]
+    return results, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+def recall_at_k(results: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(r[r >= 0]) & set(t)) for r, t in zip(results, truth))
+    return hits / truth.size
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency benchmark for FAISS index factories.")
+    parser.add_argument("--role", default="admin")
+    parser.add_argument("--factories", nargs="+", default=["Flat", "HNSW32", "IVF256,PQ32"])
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 10, 100])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nprobe", type=int, default=CONFIG["INDEX_SEARCH_PARAMS"].get("nprobe", 16))
+    parser.add_argument("--ef-search", type=int, default=CONFIG["INDEX_SEARCH_PARAMS"].get("efSearch", 64))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = load_corpus_vectors(args.role)
+    print(f"Base corpus: {len(base)} vectors of dim {base.shape[1]} from role '{args.role}'")
+    print(f"{'vectors':>9} {'factory':<14} {'build s':>8} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8} {'memory MB':>10}")
+    for factor in args.scales:
+        corpus = scale_corpus(base, factor, rng)
+        picks = rng.choice(len(corpus), size=min(args.queries, len(corpus)), replace=False)
+        queries = corpus[picks] + rng.normal(0, corpus.std() * 0.01, (len(picks), corpus.shape[1])).astype("float32")
+        truth = None
+        for factory in args.factories:
+            start = time.perf_counter()
+            index = build_index(factory, corpus)
+            build_seconds = time.perf_counter() - start
+            apply_search_params(index, {"nprobe": args.nprobe, "efSearch": args.ef_search})
+            results, p50, p99 = measure(index, queries, args.k)
+            if truth is None:
+                # Ground truth always comes from an exact search, whatever the first factory is.
+                exact = faiss.IndexFlatL2(corpus.shape[1])
+                exact.add(corpus)
+                _, truth = exact.search(queries, args.k)
+            memory_mb = faiss.serialize_index(index).nbytes / (1024 ** 2)
+            print(f"{len(corpus):>9} {factory:<14} {build_seconds:>8.2f} {recall_at_k(results, truth):>9.3f} {p50:>8.3f} {p99:>8.3f} {memory_mb:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Benchmark PDF text extraction backends on the bundled dataset/pdfs corpus.
+
+Run from the server folder:
+    python benchmarks/bench_pdf_extraction.py [--workers N] [--pages-per-task N]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import CONFIG
+from pdf_extractors import EXTRACTORS, extract_texts
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure pages/second for each PDF extraction backend.")
+    parser.add_argument("--folder", default=os.path.join(CONFIG["ROOT_DIR"], "dataset", "pdfs"))
+    parser.add_argument("--workers", type=int, default=CONFIG["PDF_EXTRACT_WORKERS"])
+    parser.add_argument("--pages-per-task", type=int, default=CONFIG["PDF_PAGES_PER_TASK"])
+    args = parser.parse_args()
+
+    files = sorted(
+        os.path.join(args.folder, name) for name in os.listdir(args.folder)
+        if name.lower().endswith(".pdf")
+    )
+    print(f"Corpus: {len(files)} PDFs in {args.folder}")
+    print(f"{'backend':<10} {'mode':<10} {'pages':>7} {'seconds':>9} {'pages/s':>9} {'chars':>10}")
+    for backend in EXTRACTORS:
+        try:
+            pages = sum(EXTRACTORS[backend]().page_count(path) for path in files)
+        except ImportError as e:
+            print(f"{backend:<10} skipped: {e}")
+            continue
+        for mode, workers in (("serial", 1), (f"{args.workers} procs", args.workers)):
+            start = time.perf_counter()
+            texts = extract_texts(files, backend=backend, max_workers=workers, pages_per_task=args.pages_per_task)
+            elapsed = time.perf_counter() - start
+            chars = sum(len(text) for text in texts.values())
+            print(f"{backend:<10} {mode:<10} {pages:>7} {elapsed:>9.2f} {pages / elapsed:>9.1f} {chars:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import os
+import json
+import sqlite3
+import threading
+import weakref
+from collections.abc import Mapping
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from config import logger
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite3"
+
+class _SqliteReader:
+    """Read-only SQLite connection shared by all threads.
+
+    It is opened eagerly so in-flight searches keep working after a refresh swaps the index
+    directory, and closed when the store that owns it is released (see load_compact).
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def fetchone(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+class ReadOnlyDocstoreError(TypeError):
+    """Raised when documents are added to or deleted from a compact docstore."""
+
+class SqliteDocstore:
+    """Docstore that reads chunk text and metadata from SQLite on demand instead of unpickling it."""
+
+    def __init__(self, reader: _SqliteReader):
+        self._reader = reader
+
+    def search(self, search: str):
+        row = self._reader.fetchone("SELECT page_content, metadata FROM docs WHERE doc_id = ?", (search,))
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]), id=search)
+
+    def add(self, texts):
+        raise ReadOnlyDocstoreError("SqliteDocstore is read-only; load the index with read_only=False to add documents")
+
+    def delete(self, ids):
+        raise ReadOnlyDocstoreError("SqliteDocstore is read-only; load the index with read_only=False to delete documents")
+
+class ReadOnlyFAISS(FAISS):
+    """FAISS store over a memory-mapped index and SqliteDocstore.
+
+    Mutations raise before FAISS touches the shared index; ingestion loads a writable copy instead.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise ReadOnlyDocstoreError("This vector store is read-only; load the index with read_only=False to modify it")
+
+    add_texts = add_embeddings = delete = merge_from = _read_only
+
+    async def aadd_texts(self, *args, **kwargs):
+        self._read_only()
+
+    def close(self):
+        """Close the docstore connection now instead of when the store is garbage-collected."""
+        self._closer()
+
+class SqliteIdMap(Mapping):
+    """Lazy FAISS position -> docstore id mapping backed by the compact docstore."""
+
+    def __init__(self, reader: _SqliteReader):
+        self._reader = reader
+
+    def __getitem__(self, position):
+        row = self._reader.fetchone("SELECT doc_id FROM docs WHERE position = ?", (int(position),))
+        if row is None:
+            raise KeyError(position)
+        return row[0]
+
+    def __iter__(self):
+        for (position,) in self._reader.fetchall("SELECT position FROM docs ORDER BY position"):
+            yield position
+
+    def __len__(self):
+        return self._reader.fetchone("SELECT COUNT(*) FROM docs")[0]
+
+def exists(path: str) -> bool:
+    return os.path.exists(os.path.join(path, DOCSTORE_FILE)) and os.path.exists(os.path.join(path, INDEX_FILE))
+
+def save_compact(vector_store: FAISS, path: str):
+    """Write the FAISS index and an SQLite docstore (in place of index.pkl) into path."""
+    os.makedirs(path, exist_ok=True)
+    faiss.write_index(vector_store.index, os.path.join(path, INDEX_FILE))
+    db_path = os.path.join(path, DOCSTORE_FILE)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("CREATE TABLE docs (position INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE, page_content TEXT NOT NULL, metadata TEXT NOT NULL)")
+        rows = []
+        for position, doc_id in vector_store.index_to_docstore_id.items():
+            doc = vector_store.docstore.search(doc_id)
+            rows.append((int(position), doc_id, doc.page_content, json.dumps(doc.metadata)))
+        conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+def load_compact(path: str, embeddings, read_only: bool = True) -> FAISS:
+    """Load a compact index.
+
+    read_only=True memory-maps the FAISS file and reads documents lazily, so worker
+    processes share the OS page cache. read_only=False materialises everything for
+    ingestion, where new vectors are appended.
+    """
+    index_path = os.path.join(path, INDEX_FILE)
+    reader = _SqliteReader(os.path.join(path, DOCSTORE_FILE))
+    if read_only:
+        flags = faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        try:
+            index = faiss.read_index(index_path, flags)
+        except RuntimeError as e:
+            logger.warning(f"Memory-mapped load not supported for {index_path}, reading into memory: {e}")
+            index = faiss.read_index(index_path)
+        store = ReadOnlyFAISS(embeddings, index, SqliteDocstore(reader), SqliteIdMap(reader))
+        # A hot swap just drops the old store; its connection closes once the last in-flight search releases it.
+        store._closer = weakref.finalize(store, reader.close)
+        return store
+    index = faiss.read_index(index_path)
+    docs = {}
+    id_map = {}
+    try:
+        for position, doc_id, page_content, metadata in reader.fetchall("SELECT position, doc_id, page_content, metadata FROM docs"):
+            docs[doc_id] = Document(page_content=page_content, metadata=json.loads(metadata), id=doc_id)
+            id_map[position] = doc_id
+    finally:
+        reader.close()
+    return FAISS(embeddings, index, InMemoryDocstore(docs), id_map)
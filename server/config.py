@@ -1,4 +1,5 @@
 import os
+import json
 import logging
 from dotenv import load_dotenv
 
@@ -26,13 +27,66 @@ def load_config():
     config = {
         'JWT_SECRET_KEY': os.getenv("JWT_SECRET_KEY", os.urandom(32).hex()),
         "ALLOWED_ORIGINS": os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(","),
-        'SQLITE_DB': "sqlite:///users.db",
+        'SQLITE_DB': os.getenv("SQLITE_DB", "sqlite:///users.db"),
+        "USER_DB_POOL_SIZE": int(os.getenv("USER_DB_POOL_SIZE", "10")),
+        "USER_DB_MAX_OVERFLOW": int(os.getenv("USER_DB_MAX_OVERFLOW", "20")),
+        "USER_DB_BUSY_TIMEOUT_MS": int(os.getenv("USER_DB_BUSY_TIMEOUT_MS", "5000")),
+        "PASSWORD_HASH_WORKERS": int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2))),
+        "AUDIT_QUEUE_MAX_SIZE": int(os.getenv("AUDIT_QUEUE_MAX_SIZE", "10000")),
+        "AUDIT_QUEUE_BATCH_SIZE": int(os.getenv("AUDIT_QUEUE_BATCH_SIZE", "200")),
+        "AUDIT_QUEUE_FLUSH_INTERVAL": float(os.getenv("AUDIT_QUEUE_FLUSH_INTERVAL", "1.0")),
+        "AUDIT_QUEUE_PUT_TIMEOUT": float(os.getenv("AUDIT_QUEUE_PUT_TIMEOUT", "2.0")),
+        "SESSION_SWEEP_INTERVAL": float(os.getenv("SESSION_SWEEP_INTERVAL", "300")),
+        "SESSION_SWEEP_BATCH_SIZE": int(os.getenv("SESSION_SWEEP_BATCH_SIZE", "500")),
+        "SESSION_RETENTION_DAYS": int(os.getenv("SESSION_RETENTION_DAYS", "30")),
+        "TOKEN_CACHE_BACKEND": os.getenv("TOKEN_CACHE_BACKEND", "memory").lower(),
+        "TOKEN_CACHE_TTL": int(os.getenv("TOKEN_CACHE_TTL", "60")),
+        "TOKEN_CACHE_MAX_ENTRIES": int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000")),
+        "TOKEN_CACHE_REDIS_URL": os.getenv("TOKEN_CACHE_REDIS_URL", "redis://localhost:6379/0"),
         "GROQ_API_KEY": os.getenv("GROQ_API_KEY"),
         "ANTHROPIC_API_KEY": os.getenv("ANTHROPIC_API_KEY"),
         "PROCESSED_DOCS_DIR": os.path.join(ROOT_DIR, "processed_docs"),
         "ROLES": ["admin", "planning", "finance", "operations"],
         "ROOT_DIR": ROOT_DIR,
         "DB_URI": os.getenv("DB_URI"),
+        "DB_POOL_SIZE": int(os.getenv("DB_POOL_SIZE", "10")),
+        "DB_MAX_OVERFLOW": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "DB_POOL_TIMEOUT": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "DB_POOL_RECYCLE": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "DB_POOL_PRE_PING": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        "SQL_MAX_ROWS": int(os.getenv("SQL_MAX_ROWS", "10000")),
+        "SQL_FETCH_BATCH_SIZE": int(os.getenv("SQL_FETCH_BATCH_SIZE", "500")),
+        "SQL_GUARD_ENABLED": os.getenv("SQL_GUARD_ENABLED", "true").lower() == "true",
+        "SQL_STATEMENT_TIMEOUT_MS": int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", "15000")),
+        "SQL_MAX_PLAN_COST": float(os.getenv("SQL_MAX_PLAN_COST", "10000000")),
+        "SQL_MAX_PLAN_ROWS": int(os.getenv("SQL_MAX_PLAN_ROWS", "50000000")),
+        "SQL_GUARD_RETRIES": int(os.getenv("SQL_GUARD_RETRIES", "2")),
+        "SQL_SUMMARY_ROW_THRESHOLD": int(os.getenv("SQL_SUMMARY_ROW_THRESHOLD", "50")),
+        "SQL_SUMMARY_CHAR_THRESHOLD": int(os.getenv("SQL_SUMMARY_CHAR_THRESHOLD", "8000")),
+        "SQL_SUMMARY_TOP_K": int(os.getenv("SQL_SUMMARY_TOP_K", "5")),
+        "SQL_SUMMARY_SAMPLE_ROWS": int(os.getenv("SQL_SUMMARY_SAMPLE_ROWS", "10")),
+        "SCHEMA_CACHE_TTL": int(os.getenv("SCHEMA_CACHE_TTL", "600")),
+        "SCHEMA_TOP_K_TABLES": int(os.getenv("SCHEMA_TOP_K_TABLES", "8")),
+        "EMBEDDING_BATCH_SIZE": int(os.getenv("EMBEDDING_BATCH_SIZE", "1")),
+        "EMBEDDING_MAX_CONCURRENCY": int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "8")),
+        "HTTP_POOL_SIZE": int(os.getenv("HTTP_POOL_SIZE", "32")),
+        "HTTP_CONNECT_TIMEOUT": float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+        "HTTP_READ_TIMEOUT": float(os.getenv("HTTP_READ_TIMEOUT", "120")),
+        "HTTP_MAX_RETRIES": int(os.getenv("HTTP_MAX_RETRIES", "3")),
+        "HTTP_RETRY_BACKOFF": float(os.getenv("HTTP_RETRY_BACKOFF", "0.5")),
+        "PDF_EXTRACTOR": os.getenv("PDF_EXTRACTOR", "pypdf2"),
+        "PDF_EXTRACT_WORKERS": int(os.getenv("PDF_EXTRACT_WORKERS", str(max(1, (os.cpu_count() or 2) - 1)))),
+        "PDF_PAGES_PER_TASK": int(os.getenv("PDF_PAGES_PER_TASK", "8")),
+        "INDEX_FACTORY": os.getenv("INDEX_FACTORY", "Flat"),
+        "INDEX_SEARCH_PARAMS": json.loads(os.getenv("INDEX_SEARCH_PARAMS", '{"nprobe": 16, "efSearch": 64}')),
+        "ROLE_INDEX_SETTINGS": json.loads(os.getenv("ROLE_INDEX_SETTINGS", "{}")),
+        "VECTOR_STORE_FORMAT": os.getenv("VECTOR_STORE_FORMAT", "pickle"),
+        "UNIFIED_INDEX": os.getenv("UNIFIED_INDEX", "false").lower() == "true",
+        "UNIFIED_INDEX_FETCH_K": int(os.getenv("UNIFIED_INDEX_FETCH_K", "100")),
+        "INGESTION_WORKERS": int(os.getenv("INGESTION_WORKERS", "2")),
+        "INGESTION_JOB_HISTORY": int(os.getenv("INGESTION_JOB_HISTORY", "1000")),
+        "EMBEDDING_CACHE_ENABLED": os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true",
+        "EMBEDDING_CACHE_PATH": os.getenv("EMBEDDING_CACHE_PATH", os.path.join(ROOT_DIR, "processed_docs", "embedding_cache.sqlite3")),
         'ROLE_PDFS': {
             "admin": [
                 "Anti-Counterfeit and Product Authenticity Policy.pdf",
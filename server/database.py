@@ -1,27 +1,104 @@
+import threading
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.engine import Engine, make_url
 from langchain_community.utilities import SQLDatabase
-from config import logger
+from llm_models import BedrockEmbeddings
+from schema_cache import SchemaCache
+from sql_guard import SQLRejectedError, validate_read_only, ensure_limit, check_plan
+from config import CONFIG, logger
+
+_engines = {}
+_engine_counters = {}
+_engines_lock = threading.Lock()
+
+def get_engine(db_uri: str) -> Engine:
+    """Return the process-wide pooled engine for db_uri, creating it on first use."""
+    with _engines_lock:
+        engine = _engines.get(db_uri)
+        if engine is not None:
+            return engine
+        options = {}
+        if make_url(db_uri).get_backend_name() != "sqlite":
+            options = {
+                "pool_size": CONFIG["DB_POOL_SIZE"],
+                "max_overflow": CONFIG["DB_MAX_OVERFLOW"],
+                "pool_timeout": CONFIG["DB_POOL_TIMEOUT"],
+                "pool_recycle": CONFIG["DB_POOL_RECYCLE"],
+            }
+        engine = create_engine(db_uri, pool_pre_ping=CONFIG["DB_POOL_PRE_PING"], **options)
+        counters = {"connections_opened": 0, "checkouts": 0}
+        if options:
+            counters["capacity"] = options["pool_size"] + options["max_overflow"]
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            counters["connections_opened"] += 1
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            counters["checkouts"] += 1
+
+        _engines[db_uri] = engine
+        _engine_counters[db_uri] = counters
+        logger.info(f"Database engine created with {type(engine.pool).__name__} {options}")
+        return engine
 
 class DatabaseManager:
+    """Analytics database access over a shared, pooled engine.
+
+    Table metadata is reflected once in connect() and again only when refresh() is called.
+    """
+
     def __init__(self, db_uri: str):
         self.db_uri = db_uri
         self.db = None
+        self.schema_cache = None
+        self._lock = threading.Lock()
 
     def connect(self):
+        if self.db is not None:
+            return self.db
+        with self._lock:
+            if self.db is not None:
+                return self.db
+            try:
+                db = SQLDatabase(get_engine(self.db_uri))
+                embeddings = None
+                if CONFIG["SCHEMA_TOP_K_TABLES"]:
+                    embeddings = BedrockEmbeddings(api_key=CONFIG["ANTHROPIC_API_KEY"], model_id="amazon-embedding-v2")
+                self.schema_cache = SchemaCache(db, CONFIG["SCHEMA_CACHE_TTL"], CONFIG["SCHEMA_TOP_K_TABLES"], embeddings)
+                self.db = db
+                logger.info("Database connected")
+                print("Step: Database connected")
+                return self.db
+            except Exception as e:
+                logger.error(f"Database connection failed: {e}")
+                print(f"Error: Database connection failed: {e}")
+                raise
+
+    def refresh(self):
+        """Reflect table metadata again on the existing engine and drop the cached schema."""
+        if not self.db:
+            return self.connect()
         try:
-            self.db = SQLDatabase.from_uri(self.db_uri)
-            logger.info("Database connected")
-            print("Step: Database connected")
+            db = SQLDatabase(get_engine(self.db_uri))
+            self.schema_cache.db = db
+            self.db = db
+            self.schema_cache.invalidate()
+            logger.info("Database metadata refreshed")
             return self.db
         except Exception as e:
-            logger.error(f"Database connection failed: {e}")
-            print(f"Error: Database connection failed: {e}")
+            logger.error(f"Database metadata refresh failed: {e}")
             raise
 
-    def get_schema(self):
+    def get_schema(self, query: Optional[str] = None):
+        """Return the cached schema, limited to the tables most relevant to query when one is given."""
         if not self.db:
             raise ValueError("Database not connected")
         try:
-            schema = self.db.get_table_info()
+            schema = self.schema_cache.schema_for(query)
             logger.info("Database schema retrieved")
             print("Step: Database schema retrieved")
             return schema
@@ -30,15 +107,109 @@ class DatabaseManager:
             print(f"Error: Schema retrieval failed: {e}")
             raise
 
-    def execute_query(self, query: str):
+    def invalidate_schema(self):
+        """Drop the cached schema so the next get_schema() reads it from the database again."""
+        if self.schema_cache is not None:
+            self.schema_cache.invalidate()
+
+    def pool_stats(self) -> Optional[dict]:
+        with _engines_lock:
+            engine = _engines.get(self.db_uri)
+            counters = dict(_engine_counters.get(self.db_uri, {}))
+        if engine is None:
+            return None
+        pool = engine.pool
+        stats = {"pool_class": type(pool).__name__, **counters}
+        # QueuePool exposes utilisation; sqlite's singleton/static pools do not.
+        for name in ("size", "checkedout", "checkedin", "overflow"):
+            if hasattr(pool, name):
+                stats[name] = getattr(pool, name)()
+        if stats.get("capacity") and "checkedout" in stats:
+            stats["utilization"] = stats["checkedout"] / stats["capacity"]
+        return stats
+
+    def stats(self) -> dict:
+        return {
+            "schema": self.schema_cache.stats() if self.schema_cache else None,
+            "pool": self.pool_stats(),
+        }
+
+    def execute_query(self, query: str, max_rows: Optional[int] = None) -> dict:
+        """Run query and return {"columns", "rows", "row_count", "truncated"}.
+
+        With CONFIG["SQL_GUARD_ENABLED"] the statement must be a single read-only
+        SELECT; it runs in a read-only transaction with a statement timeout, gets a
+        LIMIT when it has none and, on Postgres, is rejected when its EXPLAIN estimate
+        is too expensive. Rejections raise SQLRejectedError.
+
+        Rows are fetched from a streaming cursor in batches and capped at max_rows
+        (CONFIG["SQL_MAX_ROWS"] by default); truncated is True when more rows existed.
+        """
         if not self.db:
             raise ValueError("Database not connected")
+        max_rows = max_rows or CONFIG["SQL_MAX_ROWS"]
+        guarded = CONFIG["SQL_GUARD_ENABLED"]
         try:
-            results = self.db.run(query)
-            logger.info(f"SQL query executed: {query}")
+            if guarded:
+                query = ensure_limit(validate_read_only(query), max_rows + 1)
+            rows = []
+            truncated = False
+            engine = get_engine(self.db_uri)
+            with engine.connect() as conn:
+                if guarded:
+                    self._restrict(conn, engine.dialect.name)
+                    if engine.dialect.name == "postgresql":
+                        check_plan(conn, query)
+                try:
+                    result = conn.execution_options(stream_results=True, no_parameters=True).exec_driver_sql(query)
+                    columns = list(result.keys()) if result.returns_rows else []
+                    while result.returns_rows:
+                        batch = result.fetchmany(min(CONFIG["SQL_FETCH_BATCH_SIZE"], max_rows + 1 - len(rows)))
+                        if not batch:
+                            break
+                        rows.extend(tuple(row) for row in batch)
+                        if len(rows) > max_rows:
+                            rows = rows[:max_rows]
+                            truncated = True
+                            break
+                    result.close()
+                finally:
+                    conn.rollback()
+                    if guarded and engine.dialect.name == "sqlite":
+                        conn.exec_driver_sql("PRAGMA query_only = OFF")
+            logger.info(f"SQL query executed: {query} ({len(rows)} rows{', truncated' if truncated else ''})")
             print(f"Step: SQL query executed: {query}")
-            return eval(results) if results else []
+            return {"columns": columns, "rows": rows, "row_count": len(rows), "truncated": truncated}
+        except SQLRejectedError as e:
+            logger.warning(f"SQL query rejected: {e}")
+            print(f"Error: Query rejected: {e}")
+            raise
+        except OperationalError as e:
+            if "statement timeout" in str(e):
+                raise SQLRejectedError(f"the query exceeded the {CONFIG['SQL_STATEMENT_TIMEOUT_MS']} ms time limit; simplify it or filter more") from e
+            logger.error(f"Error executing query: {e}")
+            print(f"Error: Query execution failed: {e}")
+            raise
         except Exception as e:
             logger.error(f"Error executing query: {e}")
             print(f"Error: Query execution failed: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    @staticmethod
+    def _restrict(conn, dialect: str):
+        """Make the connection's current transaction read-only and time-limited."""
+        if dialect == "postgresql":
+            conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(CONFIG['SQL_STATEMENT_TIMEOUT_MS'])}")
+        elif dialect == "sqlite":
+            conn.exec_driver_sql("PRAGMA query_only = ON")
+
+def format_results(results: Optional[dict]) -> str:
+    """Render a query result as a tab-separated table for prompts."""
+    if not results:
+        return "None"
+    lines = ["\t".join(results["columns"])]
+    lines.extend("\t".join(str(value) for value in row) for row in results["rows"])
+    if results["truncated"]:
+        lines.append(f"(result truncated to the first {results['row_count']} rows)")
+    return "\n".join(lines)
@@ -1,50 +1,62 @@
+import asyncio
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from llm_models import BedrockLanguageModel
-from database import DatabaseManager
+from database import DatabaseManager, format_results
+from result_summary import results_for_prompt
 from config import CONFIG, logger
 
+SQL_PROMPT = ChatPromptTemplate.from_template(
+    """
+    You are a PostgreSQL expert. Write a single, executable SQL query to answer the query.
+    Return ONLY the SQL query, no explanations or comments.
+    If no relevant tables/columns are found, return an empty string.
+    Schema: {schema}
+    Query: {query}
+    """
+)
+
+NL_PROMPT = ChatPromptTemplate.from_template(
+    """
+    Convert the SQL query results into a concise natural language response (1-2 sentences).
+    Query: {query}
+    SQL Results: {results}
+    """
+)
+
 class DatabaseQuery:
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, llm=None):
         try:
             self.db_manager = db_manager
-            self.llm = BedrockLanguageModel(api_key=CONFIG["ANTHROPIC_API_KEY"], model_id="claude-3.5-sonnet")
+            self.llm = llm or BedrockLanguageModel(api_key=CONFIG["ANTHROPIC_API_KEY"], model_id="claude-3.5-sonnet")
             self.parser = StrOutputParser()
+            self.sql_chain = SQL_PROMPT | self.llm | self.parser
+            self.nl_chain = NL_PROMPT | self.llm | self.parser
             logger.info("DatabaseQuery initialized")
         except Exception as e:
             logger.error(f"DatabaseQuery initialization failed: {e}")
             raise
 
+    def _error_response(self, query: str, e: Exception):
+        logger.error(f"Database query failed for query '{query}': {e}")
+        return {
+            "sql_query": "",
+            "raw_response": f"Error: Database query failed: {str(e)}",
+            "natural_language_response": f"An error occurred while processing the query: {str(e)}"
+        }
+
     def execute_query(self, query: str):
         try:
-            schema = self.db_manager.get_schema()
-            sql_prompt = ChatPromptTemplate.from_template(
-                """
-                You are a PostgreSQL expert. Write a single, executable SQL query to answer the query.
-                Return ONLY the SQL query, no explanations or comments.
-                If no relevant tables/columns are found, return an empty string.
-                Schema: {schema}
-                Query: {query}
-                """
-            )
-            sql_chain = sql_prompt | self.llm | self.parser
-            sql_query = sql_chain.invoke({"schema": schema, "query": query}).strip()
+            schema = self.db_manager.get_schema(query)
+            sql_query = self.sql_chain.invoke({"schema": schema, "query": query}).strip()
             if not sql_query:
                 logger.error("No valid SQL query generated")
                 return {"sql_query": "", "raw_response": "Error: No valid SQL query generated", "natural_language_response": "No valid SQL query could be generated."}
 
             results = self.db_manager.execute_query(sql_query)
-            raw_response = str(results)
-
-            nl_prompt = ChatPromptTemplate.from_template(
-                """
-                Convert the SQL query results into a concise natural language response (1-2 sentences).
-                Query: {query}
-                SQL Results: {results}
-                """
-            )
-            nl_chain = nl_prompt | self.llm | self.parser
-            natural_language_response = nl_chain.invoke({"query": query, "results": raw_response})
+            # The LLM gets a summary of large results; clients still receive the full rows.
+            raw_response = format_results(results)
+            natural_language_response = self.nl_chain.invoke({"query": query, "results": results_for_prompt(results)})
 
             logger.info(f"Database query executed: {query}, SQL: {sql_query}")
             return {
@@ -53,9 +65,27 @@ class DatabaseQuery:
                 "natural_language_response": natural_language_response
             }
         except Exception as e:
-            logger.error(f"Database query failed for query '{query}': {e}")
+            return self._error_response(query, e)
+
+    async def aexecute_query(self, query: str):
+        """Async variant of execute_query; database calls run in a worker thread."""
+        try:
+            schema = await asyncio.to_thread(self.db_manager.get_schema, query)
+            sql_query = (await self.sql_chain.ainvoke({"schema": schema, "query": query})).strip()
+            if not sql_query:
+                logger.error("No valid SQL query generated")
+                return {"sql_query": "", "raw_response": "Error: No valid SQL query generated", "natural_language_response": "No valid SQL query could be generated."}
+
+            results = await asyncio.to_thread(self.db_manager.execute_query, sql_query)
+            # The LLM gets a summary of large results; clients still receive the full rows.
+            raw_response = format_results(results)
+            natural_language_response = await self.nl_chain.ainvoke({"query": query, "results": results_for_prompt(results)})
+
+            logger.info(f"Database query executed: {query}, SQL: {sql_query}")
             return {
-                "sql_query": "",
-                "raw_response": f"Error: Database query failed: {str(e)}",
-                "natural_language_response": f"An error occurred while processing the query: {str(e)}"
-            }
\ No newline at end of file
+                "sql_query": sql_query,
+                "raw_response": raw_response,
+                "natural_language_response": natural_language_response
+            }
+        except Exception as e:
+            return self._error_response(query, e)
\ No newline at end of file
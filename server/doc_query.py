@@ -3,12 +3,23 @@ from langchain_core.output_parsers import StrOutputParser
 from llm_models import BedrockLanguageModel
 from config import CONFIG, logger
 
+DOC_QUERY_PROMPT = ChatPromptTemplate.from_template(
+    """
+    Summarize information from the documents to answer the query.
+    Provide a concise summary (2-3 sentences).
+    If no relevant information is found, return: "No relevant document information found."
+    Query: {query}
+    Documents: {documents}
+    """
+)
+
 class DocumentQuery:
-    def __init__(self, vector_store):
+    def __init__(self, vector_store, llm=None):
         try:
             self.vector_store = vector_store
-            self.llm = BedrockLanguageModel(api_key=CONFIG["ANTHROPIC_API_KEY"], model_id="claude-3.5-sonnet")
+            self.llm = llm or BedrockLanguageModel(api_key=CONFIG["ANTHROPIC_API_KEY"], model_id="claude-3.5-sonnet")
             self.parser = StrOutputParser()
+            self.chain = DOC_QUERY_PROMPT | self.llm | self.parser
             logger.info("DocumentQuery initialized")
         except Exception as e:
             logger.error(f"DocumentQuery initialization failed: {e}")
@@ -18,19 +29,38 @@ class DocumentQuery:
         try:
             docs = self.vector_store.similarity_search(query, k=3)
             doc_content = "\n".join([doc.page_content for doc in docs])
-            prompt = ChatPromptTemplate.from_template(
-                """
-                Summarize information from the documents to answer the query.
-                Provide a concise summary (2-3 sentences).
-                If no relevant information is found, return: "No relevant document information found."
-                Query: {query}
-                Documents: {documents}
-                """
-            )
-            chain = prompt | self.llm | self.parser
-            response = chain.invoke({"query": query, "documents": doc_content})
+            response = self.chain.invoke({"query": query, "documents": doc_content})
             logger.info(f"Document query executed: {query}")
             return response
         except Exception as e:
             logger.error(f"Document query failed for query '{query}': {e}")
-            return f"Error: Document query failed: {str(e)}"
\ No newline at end of file
+            return f"Error: Document query failed: {str(e)}"
+
+    async def aexecute_query(self, query: str):
+        try:
+            docs = await self.vector_store.asimilarity_search(query, k=3)
+            doc_content = "\n".join([doc.page_content for doc in docs])
+            response = await self.chain.ainvoke({"query": query, "documents": doc_content})
+            logger.info(f"Document query executed: {query}")
+            return response
+        except Exception as e:
+            logger.error(f"Document query failed for query '{query}': {e}")
+            return f"Error: Document query failed: {str(e)}"
+
+    async def astream_query(self, query: str):
+        """Yield progress and token events for a document query, ending with a "done" event."""
+        try:
+            docs = await self.vector_store.asimilarity_search(query, k=3)
+            yield {"event": "progress", "data": {"node": "retrieve_documents", "documents": len(docs)}}
+            doc_content = "\n".join([doc.page_content for doc in docs])
+            parts = []
+            async for token in self.chain.astream({"query": query, "documents": doc_content}):
+                parts.append(token)
+                yield {"event": "token", "data": {"text": token}}
+            logger.info(f"Document query streamed: {query}")
+            yield {"event": "done", "data": {"response": "".join(parts)}}
+        except Exception as e:
+            logger.error(f"Document query failed for query '{query}': {e}")
+            response = f"Error: Document query failed: {str(e)}"
+            yield {"event": "token", "data": {"text": response}}
+            yield {"event": "done", "data": {"response": response}}
\ No newline at end of file
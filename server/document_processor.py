@@ -1,13 +1,33 @@
 import os
-import json
+import glob
+import time
+import sqlite3
 import hashlib
+import shutil
+import tempfile
 from filelock import FileLock
-from PyPDF2 import PdfReader
 from langchain_community.vectorstores import FAISS
 from llm_models import BedrockEmbeddings
+from pdf_extractors import get_extractor, extract_texts
+from ingestion_manifest import IngestionManifest
+import compact_store
+from index_factory import build_vector_store, apply_search_params, search_params_for
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from config import logger, CONFIG
 
+INDEX_LOAD_RETRIES = 5
+
+def index_path_for(name: str) -> str:
+    return os.path.join(CONFIG["PROCESSED_DOCS_DIR"], f"faiss_index_{name}")
+
+def index_version(index_path: str):
+    """Identity of the index directory on disk; every save swaps in a new directory, changing it."""
+    try:
+        st = os.stat(index_path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns)
+
 class DocumentProcessor:
     def __init__(self, doc_folder: str, role: str):
         try:
@@ -15,8 +35,11 @@ class DocumentProcessor:
             self.role = role
             self.vector_store = None
             self.embeddings_model = None
+            self.chunks_embedded = 0
             self.metadata_path = os.path.join(CONFIG["PROCESSED_DOCS_DIR"], f"metadata_{role}.json")
-            self.index_path = os.path.join(CONFIG["PROCESSED_DOCS_DIR"], f"faiss_index_{role}")
+            self.index_path = index_path_for(role)
+            self.index_version = None
+            self.lock_path = self.index_path + ".lock"
             os.makedirs(CONFIG["PROCESSED_DOCS_DIR"], exist_ok=True)
             os.makedirs(self.doc_folder, exist_ok=True)
         except Exception as e:
@@ -42,34 +65,17 @@ class DocumentProcessor:
             logger.error(f"Error computing checksum for {file_path}: {e}")
             return None
 
-    def load_metadata(self):
-        lock_path = self.metadata_path + ".lock"
-        try:
-            with FileLock(lock_path):
-                if not os.path.exists(self.metadata_path):
-                    return {}
-                with open(self.metadata_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading metadata for role {self.role}: {e}")
-            return {}
-
-    def save_metadata(self, metadata):
-        lock_path = self.metadata_path + ".lock"
-        try:
-            with FileLock(lock_path):
-                with open(self.metadata_path, "w", encoding="utf-8") as f:
-                    json.dump(metadata, f, indent=4)
-            logger.info(f"Metadata saved for role {self.role}")
-        except Exception as e:
-            logger.error(f"Error saving metadata for role {self.role}: {e}")
-            raise
+    def load_manifest(self, rebuild: bool = False) -> IngestionManifest:
+        manifest = IngestionManifest.load(self.metadata_path)
+        if rebuild or not os.path.exists(self.index_path):
+            # Documents recorded without an index on disk cannot be trusted, so they are re-embedded.
+            manifest.documents = {}
+        return manifest
 
     def extract_text_from_pdf(self, file_path):
         try:
-            with open(file_path, "rb") as file:
-                pdf_reader = PdfReader(file)
-                text = "".join(page.extract_text() or "" for page in pdf_reader.pages)
+            extractor = get_extractor()
+            text = extractor.extract_range(file_path, 0, extractor.page_count(file_path))
             logger.info(f"Text extracted from {file_path} for role {self.role}")
             return text
         except Exception as e:
@@ -86,28 +92,93 @@ class DocumentProcessor:
             logger.error(f"Error splitting text for role {self.role}: {e}")
             return []
 
-    def process_documents(self):
+    def save_vector_store_atomic(self, vector_store):
+        """Write the index into a private staging directory and swap it into place so readers never see a partial index.
+
+        Callers hold the role's FileLock. The live path is missing only between the two
+        renames; load_vector_store() retries across that gap.
+        """
+        staging = tempfile.mkdtemp(prefix=os.path.basename(self.index_path) + ".", suffix=".swap", dir=CONFIG["PROCESSED_DOCS_DIR"])
+        new_path = os.path.join(staging, "new")
+        old_path = os.path.join(staging, "old")
+        try:
+            if CONFIG["VECTOR_STORE_FORMAT"] == "compact":
+                compact_store.save_compact(vector_store, new_path)
+            else:
+                vector_store.save_local(new_path)
+            if os.path.exists(self.index_path):
+                os.replace(self.index_path, old_path)
+            os.replace(new_path, self.index_path)
+            self.index_version = index_version(self.index_path)
+            logger.info(f"Vector store saved atomically for role {self.role}")
+        except Exception as e:
+            logger.error(f"Error saving vector store for role {self.role}: {e}")
+            if not os.path.exists(self.index_path) and os.path.exists(old_path):
+                os.replace(old_path, self.index_path)
+            raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _swap_in_progress(self) -> bool:
+        """True while another writer has moved the live index aside and not yet renamed the new one in."""
+        return bool(glob.glob(os.path.join(glob.escape(CONFIG["PROCESSED_DOCS_DIR"]), glob.escape(os.path.basename(self.index_path)) + ".*.swap", "old")))
+
+    def serving_store(self):
+        """Return the store to serve after a save: in compact mode the memory-mapped, read-only copy
+        rather than the materialised one that was appended to."""
+        if CONFIG["VECTOR_STORE_FORMAT"] == "compact":
+            return self.load_vector_store(read_only=True)
+        return self.vector_store
+
+    def upgrade_index_format(self):
+        """Rewrite a pickled index in the compact format when VECTOR_STORE_FORMAT is "compact"."""
+        if CONFIG["VECTOR_STORE_FORMAT"] != "compact" or not os.path.exists(self.index_path) or compact_store.exists(self.index_path):
+            return
+        self.load_vector_store()
+        self.save_vector_store_atomic(self.vector_store)
+        logger.info(f"Vector store for role {self.role} converted to the compact format")
+
+    def process_documents(self, rebuild: bool = False):
+        """Embed chunks of unseen PDFs and merge them into the role's index.
+
+        With rebuild=True every PDF in the role folder is re-embedded into a fresh index.
+        The role's FileLock is held from loading the manifest to saving it, so workers
+        and processes ingesting the same role run one at a time.
+        """
+        with FileLock(self.lock_path):
+            return self._process_documents(rebuild)
+
+    def _process_documents(self, rebuild: bool):
         try:
             self.initialize_embeddings()
-            metadata = self.load_metadata()
+            self.upgrade_index_format()
+            index_exists = os.path.exists(self.index_path)
+            manifest = self.load_manifest(rebuild)
+            metadata = manifest.documents
             text_chunks = []
             metadatas = []
             new_files_processed = False
 
+            pending = []
             for file_name in os.listdir(self.doc_folder):
                 file_path = os.path.join(self.doc_folder, file_name)
                 if os.path.splitext(file_name)[1].lower() != ".pdf":
                     logger.info(f"Skipping non-PDF file: {file_path} for role {self.role}")
                     continue
 
-                checksum = self.compute_checksum(file_path)
+                checksum = manifest.checksum(file_path, self.compute_checksum)
                 if not checksum or checksum in metadata:
                     logger.info(f"Skipping already processed file: {file_path} for role {self.role}")
                     continue
+                pending.append((file_path, file_name, checksum))
+            manifest.prune_unseen()
 
-                text = self.extract_text_from_pdf(file_path)
+            texts = extract_texts([file_path for file_path, _, _ in pending])
+            for file_path, file_name, checksum in pending:
+                text = texts.get(file_path)
                 if not text:
                     continue
+                logger.info(f"Text extracted from {file_path} for role {self.role}")
 
                 chunks = self.split_text_into_chunks(text)
                 if not chunks:
@@ -119,25 +190,56 @@ class DocumentProcessor:
                 new_files_processed = True
 
             if new_files_processed:
-                self.vector_store = FAISS.from_texts(
-                    texts=text_chunks,
-                    embedding=self.embeddings_model,
-                    metadatas=metadatas
-                )
-                self.vector_store.save_local(self.index_path)
-                self.save_metadata(metadata)
+                # Appending needs a writable store, never a read-only one left from an earlier load.
+                self.vector_store = None
+                if index_exists and not rebuild:
+                    self.load_vector_store()
+                if self.vector_store is not None and not rebuild:
+                    self.vector_store.add_texts(texts=text_chunks, metadatas=metadatas)
+                    logger.info(f"Appended {len(text_chunks)} chunks to existing vector store for role {self.role}")
+                else:
+                    self.vector_store = build_vector_store(text_chunks, metadatas, self.embeddings_model, self.role)
+                self.save_vector_store_atomic(self.vector_store)
+                manifest.save()
+                self.chunks_embedded = len(text_chunks)
                 logger.info(f"New documents processed and vector store saved for role {self.role}")
+                return self.serving_store()
             else:
+                if manifest.dirty:
+                    manifest.save()
                 logger.info(f"No new documents to process for role {self.role}")
 
-            return self.load_vector_store()
+            return self.load_vector_store(read_only=True)
         except Exception as e:
             logger.error(f"Document processing failed for role {self.role}: {e}")
             raise
 
-    def load_vector_store(self):
+    def load_vector_store(self, read_only: bool = False):
+        """Load the role's index from disk.
+
+        Compact indexes are memory-mapped with lazily read documents when read_only is True;
+        pass read_only=False when new vectors will be appended. A load that races a writer's
+        directory swap is retried.
+        """
+        for attempt in range(INDEX_LOAD_RETRIES):
+            try:
+                if not os.path.exists(self.index_path) and self._swap_in_progress():
+                    raise FileNotFoundError(f"{self.index_path} is being replaced")
+                return self._load_vector_store(read_only)
+            except (OSError, RuntimeError, sqlite3.Error) as e:
+                if attempt == INDEX_LOAD_RETRIES - 1:
+                    raise
+                logger.warning(f"Vector store for role {self.role} unavailable (attempt {attempt + 1}), retrying: {e}")
+                time.sleep(0.05 * (attempt + 1))
+
+    def _load_vector_store(self, read_only: bool):
+        # Read before loading, so a swap during the load makes the recorded version stale, never too new.
+        version = index_version(self.index_path)
         try:
-            if os.path.exists(self.index_path):
+            if compact_store.exists(self.index_path):
+                self.vector_store = compact_store.load_compact(self.index_path, self.embeddings_model, read_only=read_only)
+                logger.info(f"Compact vector store loaded for role {self.role} (read_only={read_only})")
+            elif os.path.exists(self.index_path):
                 self.vector_store = FAISS.load_local(
                     self.index_path,
                     self.embeddings_model,
@@ -146,7 +248,154 @@ class DocumentProcessor:
                 logger.info(f"Vector store loaded for role {self.role}")
             else:
                 logger.info(f"No existing vector store found for role {self.role}")
+            if self.vector_store is not None:
+                apply_search_params(self.vector_store.index, search_params_for(self.role))
+                self.index_version = version
             return self.vector_store
         except Exception as e:
             logger.error(f"Error loading vector store for role {self.role}: {e}")
+            raise
+
+UNIFIED_INDEX_NAME = "unified"
+
+def role_bit(role: str) -> int:
+    """Bit assigned to a role in the role_mask of unified-index chunks."""
+    return 1 << CONFIG["ROLES"].index(role)
+
+class RoleFilteredVectorStore:
+    """View over the unified index that only returns chunks visible to one role."""
+
+    def __init__(self, vector_store, role: str):
+        self.vector_store = vector_store
+        self.role = role
+        self.mask = role_bit(role)
+
+    def _allowed(self, metadata: dict) -> bool:
+        return bool(metadata.get("role_mask", 0) & self.mask)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs):
+        kwargs.setdefault("fetch_k", max(CONFIG["UNIFIED_INDEX_FETCH_K"], k))
+        return self.vector_store.similarity_search(query, k=k, filter=self._allowed, **kwargs)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs):
+        kwargs.setdefault("fetch_k", max(CONFIG["UNIFIED_INDEX_FETCH_K"], k))
+        return self.vector_store.similarity_search_with_score(query, k=k, filter=self._allowed, **kwargs)
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs):
+        kwargs.setdefault("fetch_k", max(CONFIG["UNIFIED_INDEX_FETCH_K"], k))
+        return await self.vector_store.asimilarity_search(query, k=k, filter=self._allowed, **kwargs)
+
+    async def asimilarity_search_with_score(self, query: str, k: int = 4, **kwargs):
+        kwargs.setdefault("fetch_k", max(CONFIG["UNIFIED_INDEX_FETCH_K"], k))
+        return await self.vector_store.asimilarity_search_with_score(query, k=k, filter=self._allowed, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.vector_store, name)
+
+class UnifiedDocumentProcessor(DocumentProcessor):
+    """Builds one index over all role folders, storing each distinct PDF once with a role_mask."""
+
+    def __init__(self, doc_folder: str):
+        try:
+            self.base_folder = doc_folder
+            self.doc_folder = doc_folder
+            self.role = UNIFIED_INDEX_NAME
+            self.vector_store = None
+            self.embeddings_model = None
+            self.chunks_embedded = 0
+            self.metadata_path = os.path.join(CONFIG["PROCESSED_DOCS_DIR"], f"metadata_{UNIFIED_INDEX_NAME}.json")
+            self.index_path = index_path_for(UNIFIED_INDEX_NAME)
+            self.index_version = None
+            self.lock_path = self.index_path + ".lock"
+            os.makedirs(CONFIG["PROCESSED_DOCS_DIR"], exist_ok=True)
+        except Exception as e:
+            logger.error(f"Initialization failed for unified index: {e}")
+            raise
+
+    def collect_files(self, manifest: IngestionManifest):
+        """Map checksum -> (file path, file name, role_mask) across every role folder."""
+        files = {}
+        for role in CONFIG["ROLES"]:
+            role_folder = os.path.join(self.base_folder, role)
+            if not os.path.isdir(role_folder):
+                continue
+            for file_name in os.listdir(role_folder):
+                if os.path.splitext(file_name)[1].lower() != ".pdf":
+                    continue
+                file_path = os.path.join(role_folder, file_name)
+                checksum = manifest.checksum(file_path, self.compute_checksum)
+                if not checksum:
+                    continue
+                _, _, mask = files.get(checksum, (file_path, file_name, 0))
+                files[checksum] = (file_path, file_name, mask | role_bit(role))
+        manifest.prune_unseen()
+        return files
+
+    def _process_documents(self, rebuild: bool):
+        try:
+            self.initialize_embeddings()
+            self.upgrade_index_format()
+            index_exists = os.path.exists(self.index_path)
+            manifest = self.load_manifest(rebuild)
+            metadata = manifest.documents
+            text_chunks = []
+            metadatas = []
+            mask_updates = {}
+
+            files = self.collect_files(manifest)
+            for checksum, entry in metadata.items():
+                # Files removed from every role folder stay embedded but become invisible.
+                if checksum not in files and entry.get("role_mask"):
+                    mask_updates[checksum] = 0
+                    entry["role_mask"] = 0
+
+            pending = []
+            for checksum, (file_path, file_name, mask) in files.items():
+                if checksum in metadata:
+                    if metadata[checksum].get("role_mask") != mask:
+                        mask_updates[checksum] = mask
+                        metadata[checksum]["role_mask"] = mask
+                    continue
+                pending.append((checksum, file_path, file_name, mask))
+
+            texts = extract_texts([file_path for _, file_path, _, _ in pending])
+            for checksum, file_path, file_name, mask in pending:
+                text = texts.get(file_path)
+                if not text:
+                    continue
+                chunks = self.split_text_into_chunks(text)
+                if not chunks:
+                    continue
+
+                text_chunks.extend(chunks)
+                metadatas.extend([{"file_name": file_name, "checksum": checksum, "role_mask": mask} for _ in chunks])
+                metadata[checksum] = {"original_name": file_name, "role_mask": mask}
+
+            if not text_chunks and not mask_updates:
+                if manifest.dirty:
+                    manifest.save()
+                logger.info("No new documents to process for unified index")
+                return self.load_vector_store(read_only=True)
+
+            self.vector_store = None
+            if index_exists and not rebuild:
+                self.load_vector_store()
+            if mask_updates and self.vector_store is not None:
+                # Role ACL changes only touch chunk metadata; vectors are reused as-is.
+                for doc in self.vector_store.docstore._dict.values():
+                    checksum = doc.metadata.get("checksum")
+                    if checksum in mask_updates:
+                        doc.metadata["role_mask"] = mask_updates[checksum]
+            if text_chunks:
+                if self.vector_store is not None and not rebuild:
+                    self.vector_store.add_texts(texts=text_chunks, metadatas=metadatas)
+                else:
+                    self.vector_store = build_vector_store(text_chunks, metadatas, self.embeddings_model, self.role)
+            self.save_vector_store_atomic(self.vector_store)
+            manifest.save()
+            self.chunks_embedded = len(text_chunks)
+            logger.info(f"Unified index updated: {len(text_chunks)} new chunks, {len(mask_updates)} role changes")
+            return self.serving_store()
+        except Exception as e:
+            logger.error(f"Document processing failed for unified index: {e}")
             raise
\ No newline at end of file
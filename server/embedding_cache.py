@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from array import array
+from typing import Dict, List, Optional
+from config import CONFIG, logger
+
+class EmbeddingCache:
+    """Content-addressed on-disk store of embeddings keyed by (model_id, sha256 of text)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model_id TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model_id, text_hash))"
+            )
+            self._conn.commit()
+            logger.info(f"Embedding cache opened at {path}")
+        except Exception as e:
+            logger.error(f"Failed to open embedding cache at {path}: {e}")
+            raise
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model_id: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Return cached vectors aligned with texts, None where the text has not been embedded yet."""
+        hashes = [self.text_hash(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        unique = list(set(hashes))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model_id = ? AND text_hash IN ({placeholders})",
+                    [model_id, *part]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = array("f", blob).tolist()
+            results = [found.get(h) for h in hashes]
+            hit_count = sum(1 for r in results if r is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+        return results
+
+    def put_many(self, model_id: str, texts: List[str], vectors: List[List[float]]):
+        rows = [(model_id, self.text_hash(text), array("f", vector).tobytes()) for text, vector in zip(texts, vectors)]
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model_id, text_hash, vector) VALUES (?, ?, ?)", rows
+                )
+                self._conn.commit()
+        except Exception as e:
+            # A failed cache write must never fail ingestion; the vectors are simply recomputed next time.
+            logger.error(f"Failed to write {len(rows)} embeddings to cache: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": entries,
+            }
+
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process-wide embedding cache, or None when caching is disabled."""
+    global _embedding_cache
+    if not CONFIG["EMBEDDING_CACHE_ENABLED"]:
+        return None
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(CONFIG["EMBEDDING_CACHE_PATH"])
+    return _embedding_cache
@@ -0,0 +1,165 @@
+import json
+import time
+import random
+import asyncio
+import threading
+import weakref
+from collections import deque
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from config import CONFIG, logger
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class HttpTransport:
+    """Shared keep-alive HTTP client for the Bedrock endpoint.
+
+    Requests reuse pooled connections, honour connect/read timeouts and retry
+    429/5xx and connection failures with exponential backoff and full jitter.
+    Latency is recorded per operation for monitoring. post_json serves
+    synchronous callers; apost_json uses an httpx.AsyncClient so coroutines never
+    block the event loop. Each event loop gets its own AsyncClient, which is closed
+    when that loop shuts down.
+    """
+
+    def __init__(self, pool_size: int, connect_timeout: float, read_timeout: float, max_retries: int, retry_backoff: float, window: int = 1000):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.pool_size = pool_size
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._window = window
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _record(self, operation: str, elapsed: float, error: bool, retries: int):
+        with self._lock:
+            metric = self._metrics.setdefault(operation, {"calls": 0, "errors": 0, "retries": 0, "latencies": deque(maxlen=self._window)})
+            metric["calls"] += 1
+            metric["errors"] += int(error)
+            metric["retries"] += retries
+            metric["latencies"].append(elapsed)
+
+    def backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, self.retry_backoff * (2 ** attempt))
+
+    def post_json(self, url: str, payload: dict, operation: str = "default") -> dict:
+        start = time.perf_counter()
+        last_error = None
+        attempt = 0
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = self.session.post(url, data=json.dumps(payload), timeout=self.timeout)
+                    response.raise_for_status()
+                    result = response.json()
+                    self._record(operation, time.perf_counter() - start, False, attempt)
+                    return result
+                except requests.exceptions.HTTPError as e:
+                    if e.response is None or e.response.status_code not in RETRYABLE_STATUS_CODES:
+                        raise
+                    last_error = e
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    last_error = e
+                if attempt < self.max_retries:
+                    delay = self.backoff_delay(attempt)
+                    logger.warning(f"{operation} request failed ({last_error}), retrying in {delay:.2f}s")
+                    time.sleep(delay)
+            raise last_error
+        except Exception:
+            self._record(operation, time.perf_counter() - start, True, attempt)
+            raise
+
+    async def _close_on_loop_shutdown(self, client: httpx.AsyncClient):
+        # Parked for the loop's lifetime; asyncio.run() finalizes open async generators
+        # before closing the loop, which runs this finally block on that loop.
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._async_clients.pop(asyncio.get_running_loop(), None)
+            await client.aclose()
+
+    async def _get_async_client(self) -> httpx.AsyncClient:
+        # An AsyncClient is bound to the loop that created it, so each loop gets its own.
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_clients.get(loop)
+        if entry is not None:
+            return entry[0]
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            headers={"Content-Type": "application/json"},
+        )
+        closer = self._close_on_loop_shutdown(client)
+        await closer.asend(None)
+        with self._lock:
+            self._async_clients[loop] = (client, closer)
+        return client
+
+    async def apost_json(self, url: str, payload: dict, operation: str = "default") -> dict:
+        client = await self._get_async_client()
+        start = time.perf_counter()
+        last_error = None
+        attempt = 0
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await client.post(url, content=json.dumps(payload))
+                    response.raise_for_status()
+                    result = response.json()
+                    self._record(operation, time.perf_counter() - start, False, attempt)
+                    return result
+                except httpx.HTTPStatusError as e:
+                    if e.response.status_code not in RETRYABLE_STATUS_CODES:
+                        raise
+                    last_error = e
+                except httpx.TransportError as e:
+                    last_error = e
+                if attempt < self.max_retries:
+                    delay = self.backoff_delay(attempt)
+                    logger.warning(f"{operation} request failed ({last_error}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+            raise last_error
+        except Exception:
+            self._record(operation, time.perf_counter() - start, True, attempt)
+            raise
+
+    async def aclose(self):
+        """Close the running loop's AsyncClient."""
+        with self._lock:
+            entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[1].aclose()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {}
+            for operation, metric in self._metrics.items():
+                latencies = sorted(metric["latencies"])
+                def percentile(p):
+                    return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+                stats[operation] = {
+                    "calls": metric["calls"],
+                    "errors": metric["errors"],
+                    "retries": metric["retries"],
+                    "p50_ms": percentile(0.50),
+                    "p95_ms": percentile(0.95),
+                    "p99_ms": percentile(0.99),
+                }
+            return stats
+
+http_transport = HttpTransport(
+    pool_size=CONFIG["HTTP_POOL_SIZE"],
+    connect_timeout=CONFIG["HTTP_CONNECT_TIMEOUT"],
+    read_timeout=CONFIG["HTTP_READ_TIMEOUT"],
+    max_retries=CONFIG["HTTP_MAX_RETRIES"],
+    retry_backoff=CONFIG["HTTP_RETRY_BACKOFF"],
+)
@@ -0,0 +1,76 @@
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from config import CONFIG, logger
+
+# faiss warns that k-means clustering is unreliable below 39 training points per centroid.
+MIN_POINTS_PER_CENTROID = 39
+
+def factory_for(role: str) -> str:
+    """FAISS index_factory string for a role, e.g. "Flat", "HNSW32" or "IVF256,PQ32"."""
+    return CONFIG["ROLE_INDEX_SETTINGS"].get(role, {}).get("factory", CONFIG["INDEX_FACTORY"])
+
+def search_params_for(role: str) -> dict:
+    params = dict(CONFIG["INDEX_SEARCH_PARAMS"])
+    params.update(CONFIG["ROLE_INDEX_SETTINGS"].get(role, {}).get("search_params", {}))
+    return params
+
+def min_training_points(index: faiss.Index) -> int:
+    """Training vectors needed for MIN_POINTS_PER_CENTROID points per IVF list and per PQ centroid."""
+    # downcast_index returns non-owning views, so index itself must stay referenced.
+    inner = faiss.downcast_index(index)
+    while isinstance(inner, faiss.IndexPreTransform):
+        inner = faiss.downcast_index(inner.index)
+    centroids = [inner.nlist] if isinstance(inner, faiss.IndexIVF) else []
+    pq = getattr(inner, "pq", None)
+    if pq is not None:
+        centroids.append(pq.ksub)
+    return MIN_POINTS_PER_CENTROID * max(centroids, default=0)
+
+def train_index(factory: str, vectors: np.ndarray) -> faiss.Index:
+    """Create an empty index trained on vectors, falling back to Flat when there are too few to train it well."""
+    dim = vectors.shape[1]
+    index = faiss.index_factory(dim, factory)
+    if index.is_trained:
+        return index
+    needed = min_training_points(index)
+    if len(vectors) < needed:
+        logger.warning(f"'{factory}' needs at least {needed} training vectors, got {len(vectors)}; using a flat index")
+        return faiss.index_factory(dim, "Flat")
+    try:
+        index.train(vectors)
+    except RuntimeError as e:
+        logger.warning(f"Cannot train '{factory}' on {len(vectors)} vectors, using a flat index: {e}")
+        index = faiss.index_factory(dim, "Flat")
+    else:
+        logger.info(f"Trained '{factory}' on {len(vectors)} vectors")
+    return index
+
+def build_index(factory: str, vectors: np.ndarray) -> faiss.Index:
+    index = train_index(factory, vectors)
+    index.add(vectors)
+    return index
+
+def apply_search_params(index: faiss.Index, params: dict):
+    """Set tuning parameters such as nprobe or efSearch, ignoring ones the index type does not have."""
+    space = faiss.ParameterSpace()
+    for name, value in params.items():
+        try:
+            space.set_index_parameter(index, name, value)
+        except RuntimeError:
+            continue
+
+def build_vector_store(texts, metadatas, embeddings, role: str) -> FAISS:
+    """Embed texts and wrap them in a LangChain FAISS store using the role's configured index type."""
+    factory = factory_for(role)
+    if factory == "Flat":
+        vector_store = FAISS.from_texts(texts=texts, embedding=embeddings, metadatas=metadatas)
+    else:
+        vectors = embeddings.embed_documents(texts)
+        index = train_index(factory, np.asarray(vectors, dtype="float32"))
+        vector_store = FAISS(embeddings, index, InMemoryDocstore(), {})
+        vector_store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas)
+    apply_search_params(vector_store.index, search_params_for(role))
+    logger.info(f"Built {type(faiss.downcast_index(vector_store.index)).__name__} index ('{factory}' requested) with {len(texts)} vectors for {role}")
+    return vector_store
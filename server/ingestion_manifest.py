@@ -0,0 +1,83 @@
+import os
+import json
+from filelock import FileLock
+from config import CONFIG, logger
+
+MANIFEST_VERSION = 2
+
+class IngestionManifest:
+    """Per-index record of ingested documents and the file stats they were hashed from.
+
+    "documents" maps a content checksum to what was embedded for it; "files" maps a
+    path to (size, mtime_ns, inode, checksum) so unchanged files are recognised
+    from os.stat alone and only new or modified files are re-hashed.
+    """
+
+    def __init__(self, path: str, documents: dict = None, files: dict = None):
+        self.path = path
+        self.documents = documents or {}
+        self.files = files or {}
+        self.dirty = False
+        self._seen = set()
+
+    @classmethod
+    def load(cls, path: str):
+        if not os.path.exists(path):
+            return cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading ingestion manifest {path}: {e}")
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            # Legacy metadata_<role>.json: a flat {checksum: {"original_name": ...}} mapping.
+            manifest = cls(path, documents=data)
+            manifest.dirty = True
+            return manifest
+        return cls(path, documents=data.get("documents"), files=data.get("files"))
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.relpath(os.path.abspath(file_path), CONFIG["ROOT_DIR"])
+
+    def checksum(self, file_path: str, compute_checksum):
+        """Return the file's checksum, hashing it only when its stat signature changed."""
+        key = self._key(file_path)
+        self._seen.add(key)
+        try:
+            st = os.stat(file_path)
+        except OSError as e:
+            logger.error(f"Error reading file stats for {file_path}: {e}")
+            return None
+        signature = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "inode": st.st_ino}
+        entry = self.files.get(key)
+        if entry and all(entry.get(field) == value for field, value in signature.items()):
+            return entry["checksum"]
+        checksum = compute_checksum(file_path)
+        if checksum:
+            self.files[key] = {**signature, "checksum": checksum}
+            self.dirty = True
+        return checksum
+
+    def prune_unseen(self):
+        """Forget stat entries for files that were not visited in this pass."""
+        stale = [key for key in self.files if key not in self._seen]
+        for key in stale:
+            del self.files[key]
+        if stale:
+            self.dirty = True
+
+    def save(self):
+        lock_path = self.path + ".lock"
+        tmp_path = self.path + ".tmp"
+        try:
+            with FileLock(lock_path):
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"version": MANIFEST_VERSION, "documents": self.documents, "files": self.files}, f, indent=4)
+                os.replace(tmp_path, self.path)
+            self.dirty = False
+            logger.info(f"Ingestion manifest saved: {self.path}")
+        except Exception as e:
+            logger.error(f"Error saving ingestion manifest {self.path}: {e}")
+            raise
@@ -0,0 +1,100 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from typing import Optional
+from vector_store_registry import vector_store_registry
+from config import CONFIG, logger
+
+class IngestionQueue:
+    """Background worker pool that ingests uploaded documents off the request path.
+
+    Jobs submitted for a role while an earlier job for that role is still queued are
+    coalesced into a single index update.
+    """
+
+    def __init__(self, max_workers: int, history: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion")
+        self._history = history
+        self._jobs = OrderedDict()
+        self._pending = {}
+        self._scheduled = set()
+        self._lock = threading.Lock()
+
+    def submit(self, role: str, filename: str, user_id: int) -> str:
+        job_id = str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "role": role,
+            "filename": filename,
+            "user_id": user_id,
+            "status": "queued",
+            "chunks_embedded": 0,
+            "error": None,
+            "created_at": datetime.now(ZoneInfo("Asia/Kolkata")),
+            "_started": None,
+            "_finished": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._trim()
+            self._pending.setdefault(role, []).append(job_id)
+            if role not in self._scheduled:
+                self._scheduled.add(role)
+                self._executor.submit(self._run, role)
+        logger.info(f"Ingestion job {job_id} queued for {filename} (role {role})")
+        return job_id
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(self._jobs) - self._history)]:
+            del self._jobs[job_id]
+
+    def _run(self, role: str):
+        with self._lock:
+            job_ids = self._pending.pop(role, [])
+            self._scheduled.discard(role)
+            started = time.monotonic()
+            for job_id in job_ids:
+                self._jobs[job_id].update(status="running", _started=started)
+        logger.info(f"Ingestion started for role {role} covering {len(job_ids)} job(s)")
+        try:
+            chunks = vector_store_registry.ingest(role)
+            update = {"status": "done", "chunks_embedded": chunks}
+            logger.info(f"Ingestion finished for role {role}: {chunks} chunks embedded")
+        except Exception as e:
+            logger.error(f"Ingestion failed for role {role}: {e}", exc_info=True)
+            update = {"status": "failed", "error": str(e)}
+        with self._lock:
+            finished = time.monotonic()
+            for job_id in job_ids:
+                if job_id in self._jobs:
+                    self._jobs[job_id].update(_finished=finished, **update)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+        started, finished = job.pop("_started"), job.pop("_finished")
+        if started is None:
+            job["elapsed_seconds"] = 0.0
+        else:
+            job["elapsed_seconds"] = (finished or time.monotonic()) - started
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {"jobs": counts, "roles_pending": sorted(self._pending)}
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+ingestion_queue = IngestionQueue(CONFIG["INGESTION_WORKERS"], CONFIG["INGESTION_JOB_HISTORY"])
@@ -1,62 +1,153 @@
 # server/llm_agent.py
-from typing import TypedDict, Optional
+from typing import TypedDict, Optional, Annotated
 import json
+import time
+import asyncio
 from langgraph.graph import StateGraph, END
 from langchain_groq import ChatGroq
 from llm_models import BedrockLanguageModel
+from result_summary import results_for_prompt
+from sql_guard import SQLRejectedError
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from config import logger, CONFIG
 
 
+PLAN_PROMPT = ChatPromptTemplate.from_template(
+    """
+    You are a data analyst planning how to answer a query using a PostgreSQL database and a document repository.
+    Provide a JSON plan with:
+    {{
+        "intent": "document" | "data" | "hybrid",
+        "approach": "db_first" | "doc_first" | "parallel" | "none",
+        "db_query": string,
+        "doc_query": string
+    }}
+    - intent: 'document' (document-based), 'data' (database-based), or 'hybrid' (both).
+    - approach: For 'hybrid', specify 'db_first' or 'doc_first' when one sub-query needs the other's results, or 'parallel' when they are independent; use 'none' for 'document' or 'data'.
+    - db_query: Sub-query for the database (e.g., "Count of basket sales in Kolkata") or "" if not applicable.
+    - doc_query: Sub-query for documents (e.g., "Kolkata sales in winter season") or "" if not applicable.
+    For complex queries, split into db and doc sub-queries based on the schema and context.
+    Return the JSON object, enclosed in ```json\n{{...}}\n```.
+    Schema: {schema}
+    Query: {query}
+    """
+)
+
+SQL_PROMPT = ChatPromptTemplate.from_template(
+    """
+    You are a PostgreSQL expert. Write a single, executable SQL query to answer the database sub-query.
+    - Use the schema to identify relevant tables and columns.
+    - Focus on the sub-query: {db_query}.
+    - Return ONLY the SQL query, no explanations, comments, or backticks.
+    - If no relevant tables/columns are found, return an empty string.
+    Schema: {schema}
+    Document Info: {doc_results}
+    Plan: {plan}
+    Previous Attempt: {feedback}
+    """
+)
+
+DOC_SUMMARY_PROMPT = ChatPromptTemplate.from_template(
+    """
+    You are a data analyst. Summarize information from the documents to answer the document sub-query.
+    - Focus on the sub-query: {doc_query}.
+    - Provide a concise summary (2-3 sentences).
+    - If no relevant information is found, return: "No relevant document information found."
+    Documents: {documents}
+    Plan: {plan}
+    """
+)
+
+COMPLETION_PROMPT = ChatPromptTemplate.from_template(
+    """
+    You are a data analyst reviewing query resolution against the plan. Determine if the query is fully answered.
+    - Plan: {plan}
+    - Query: {query}
+    - Database Results: {db_results}
+    - Document Results: {doc_results}
+    Return a JSON object with:
+    {{
+        "completed": Boolean (true if both db_query and doc_query are answered per plan, false if not),
+        "remaining": String describing what's missing or "None" if complete,
+        "action": String ("db_query", "doc_query", "none") for next step if incomplete
+    }}
+    Return the JSON object, enclosed in ```json\n{{...}}\n```.
+    """
+)
+
+FINAL_RESPONSE_PROMPT = ChatPromptTemplate.from_template(
+    """
+    You are a data analyst. Provide a concise, professional response to the query using outputs from all nodes.
+    - Use database results for numerical or factual answers.
+    - Include document information (1-2 sentences) if relevant.
+    - If incomplete (per completion status), note what's missing and suggest rephrasing.
+    - If an error occurred, explain it clearly using the error message in final_response.
+    Schema: {schema}
+    Query: {query}
+    Plan: {plan}
+    Database Results: {db_results}
+    Document Results: {doc_results}
+    Completion Status: {completion_status}
+    """
+)
+
+def merge_timings(current: Optional[dict], update: Optional[dict]) -> Optional[dict]:
+    """Reducer letting the parallel branches each record their own duration."""
+    if not update:
+        return current
+    return {**(current or {}), **update}
+
 class AgentState(TypedDict):
     query: str
     plan: Optional[dict]
     document_results: Optional[str]
     sql_query: Optional[str]
-    db_results: Optional[list]
+    db_results: Optional[dict]
     final_response: Optional[str]
     completion_status: Optional[dict]
+    branch_timings: Annotated[Optional[dict], merge_timings]
+
+def is_parallel(plan: Optional[dict]) -> bool:
+    """Hybrid plans whose sub-queries do not depend on each other's results."""
+    return bool(plan) and plan.get("intent") == "hybrid" and plan.get("approach") not in ("db_first", "doc_first") \
+        and bool(plan.get("db_query")) and bool(plan.get("doc_query"))
+
+def parallel_savings_ms(timings: Optional[dict]) -> Optional[float]:
+    """Time saved by running both branches at once instead of back to back."""
+    if not timings or "query_database" not in timings or "query_documents" not in timings:
+        return None
+    return min(timings["query_database"], timings["query_documents"])
 
 class QueryAgent:
-    def __init__(self, db_manager, vector_store):
+    """LangGraph agent answering queries from the database and a role's documents.
+
+    Instances hold no per-query state, so one agent (and its compiled workflow) is
+    shared by all concurrent requests for a role; see query_services.
+    """
+
+    def __init__(self, db_manager, vector_store, llm=None):
         self.db_manager = db_manager
         self.vector_store = vector_store
         # self.llm = ChatGroq(model="llama-3.3-70b-versatile", api_key=CONFIG["GROQ_API_KEY"])
         # self.llm = ChatAnthropic(model="claude-3.5-sonnet",api_key=CONFIG["ANTHROPIC_API_KEY"])
-        self.llm = BedrockLanguageModel(api_key=CONFIG["ANTHROPIC_API_KEY"], model_id="claude-3.5-sonnet")
+        self.llm = llm or BedrockLanguageModel(api_key=CONFIG["ANTHROPIC_API_KEY"], model_id="claude-3.5-sonnet")
         self.parser = StrOutputParser()
+        self.plan_chain = PLAN_PROMPT | self.llm | self.parser
+        self.sql_chain = SQL_PROMPT | self.llm | self.parser
+        self.doc_chain = DOC_SUMMARY_PROMPT | self.llm | self.parser
+        self.completion_chain = COMPLETION_PROMPT | self.llm | self.parser
+        self.final_chain = FINAL_RESPONSE_PROMPT | self.llm | self.parser
         logger.info("LLM initialized")
         print("Step: LLM initialized")
         self.workflow = self._build_workflow()
         logger.info("Agent initialized")
 
-    def _plan_query_strategy(self, state: AgentState) -> AgentState:
+    async def _plan_query_strategy(self, state: AgentState) -> AgentState:
         print("Step: Planning query strategy...")
-        prompt = ChatPromptTemplate.from_template(
-            """
-            You are a data analyst planning how to answer a query using a PostgreSQL database and a document repository.
-            Provide a JSON plan with:
-            {{
-                "intent": "document" | "data" | "hybrid",
-                "approach": "db_first" | "doc_first" | "none",
-                "db_query": string,
-                "doc_query": string
-            }}
-            - intent: 'document' (document-based), 'data' (database-based), or 'hybrid' (both).
-            - approach: For 'hybrid', specify 'db_first' or 'doc_first'; use 'none' for 'document' or 'data'.
-            - db_query: Sub-query for the database (e.g., "Count of basket sales in Kolkata") or "" if not applicable.
-            - doc_query: Sub-query for documents (e.g., "Kolkata sales in winter season") or "" if not applicable.
-            For complex queries, split into db and doc sub-queries based on the schema and context.
-            Return the JSON object, enclosed in ```json\n{{...}}\n```.
-            Schema: {schema}
-            Query: {query}
-            """
-        )
         try:
-            schema = self.db_manager.get_schema()
-            chain = prompt | self.llm | self.parser
-            plan_response = chain.invoke({"query": state["query"], "schema": schema}).strip()
+            schema = await asyncio.to_thread(self.db_manager.get_schema, state["query"])
+            plan_response = (await self.plan_chain.ainvoke({"query": state["query"], "schema": schema})).strip()
             logger.info(f"Raw plan response: {plan_response}")
             # Find the first { and last } to extract the JSON content
             start_idx = plan_response.find("{")
@@ -84,7 +175,7 @@ class QueryAgent:
             print("Step: Using default plan")
         return state
 
-    def _query_database(self, state: AgentState) -> AgentState:
+    async def _query_database(self, state: AgentState) -> AgentState:
         if state["plan"]["intent"] not in ["data", "hybrid"] or not state["plan"]["db_query"]:
             print("Step: Querying database... (Skipped)")
             return state
@@ -93,42 +184,40 @@ class QueryAgent:
             return state
         print("Step: Querying database...")
         try:
-            schema = self.db_manager.get_schema()
-            prompt = ChatPromptTemplate.from_template(
-                """
-                You are a PostgreSQL expert. Write a single, executable SQL query to answer the database sub-query.
-                - Use the schema to identify relevant tables and columns.
-                - Focus on the sub-query: {db_query}.
-                - Return ONLY the SQL query, no explanations, comments, or backticks.
-                - If no relevant tables/columns are found, return an empty string.
-                Schema: {schema}
-                Document Info: {doc_results}
-                Plan: {plan}
-                """
-            )
-            chain = prompt | self.llm | self.parser
-            sql_query = chain.invoke({
-                "schema": schema,
-                "doc_results": state["document_results"] or "None",
-                "db_query": state["plan"]["db_query"],
-                "plan": json.dumps(state["plan"])
-            }).strip()
-            if not sql_query:
-                logger.error("No valid SQL query generated")
-                state["final_response"] = "Error: No valid SQL query generated for the database sub-query."
-                print("Step: SQL generation failed")
-                return state
-            state["sql_query"] = sql_query
-            state["db_results"] = self.db_manager.execute_query(sql_query)
+            schema = await asyncio.to_thread(self.db_manager.get_schema, state["plan"]["db_query"])
+            feedback = "None"
+            # Guard rejections are returned to the LLM so it can write a cheaper or read-only query.
+            for attempt in range(CONFIG["SQL_GUARD_RETRIES"] + 1):
+                sql_query = (await self.sql_chain.ainvoke({
+                    "schema": schema,
+                    "doc_results": state["document_results"] or "None",
+                    "db_query": state["plan"]["db_query"],
+                    "plan": json.dumps(state["plan"]),
+                    "feedback": feedback
+                })).strip()
+                if not sql_query:
+                    logger.error("No valid SQL query generated")
+                    state["final_response"] = "Error: No valid SQL query generated for the database sub-query."
+                    print("Step: SQL generation failed")
+                    return state
+                state["sql_query"] = sql_query
+                try:
+                    state["db_results"] = await asyncio.to_thread(self.db_manager.execute_query, sql_query)
+                    break
+                except SQLRejectedError as e:
+                    if attempt == CONFIG["SQL_GUARD_RETRIES"]:
+                        raise
+                    feedback = f"This query was rejected because {e}. Write a different query.\n{sql_query}"
+                    print(f"Step: SQL rejected, retrying: {e}")
             logger.info(f"SQL query executed: {sql_query}")
-            print(f"Step: Database results: {state['db_results']}")
+            print(f"Step: Database results: {state['db_results']['row_count']} rows")
         except Exception as e:
             logger.error(f"Error querying database: {e}")
             state["final_response"] = f"Error querying database: {str(e)}. Unable to retrieve data."
             print("Step: Database query failed")
         return state
 
-    def _query_documents(self, state: AgentState) -> AgentState:
+    async def _query_documents(self, state: AgentState) -> AgentState:
         if state["plan"]["intent"] not in ["document", "hybrid"] or not state["plan"]["doc_query"]:
             print("Step: Querying documents... (Skipped)")
             return state
@@ -137,20 +226,9 @@ class QueryAgent:
             return state
         print("Step: Querying documents...")
         try:
-            docs = self.vector_store.similarity_search(state["plan"]["doc_query"], k=3)
+            docs = await self.vector_store.asimilarity_search(state["plan"]["doc_query"], k=3)
             doc_content = "\n".join([doc.page_content for doc in docs])
-            prompt = ChatPromptTemplate.from_template(
-                """
-                You are a data analyst. Summarize information from the documents to answer the document sub-query.
-                - Focus on the sub-query: {doc_query}.
-                - Provide a concise summary (2-3 sentences).
-                - If no relevant information is found, return: "No relevant document information found."
-                Documents: {documents}
-                Plan: {plan}
-                """
-            )
-            chain = prompt | self.llm | self.parser
-            state["document_results"] = chain.invoke({
+            state["document_results"] = await self.doc_chain.ainvoke({
                 "doc_query": state["plan"]["doc_query"],
                 "documents": doc_content,
                 "plan": json.dumps(state["plan"])
@@ -163,32 +241,15 @@ class QueryAgent:
             print("Step: Document query failed")
         return state
 
-    def _check_completion(self, state: AgentState) -> AgentState:
+    async def _check_completion(self, state: AgentState) -> AgentState:
         print("Step: Checking completion...")
-        prompt = ChatPromptTemplate.from_template(
-            """
-            You are a data analyst reviewing query resolution against the plan. Determine if the query is fully answered.
-            - Plan: {plan}
-            - Query: {query}
-            - Database Results: {db_results}
-            - Document Results: {doc_results}
-            Return a JSON object with:
-            {{
-                "completed": Boolean (true if both db_query and doc_query are answered per plan, false if not),
-                "remaining": String describing what's missing or "None" if complete,
-                "action": String ("db_query", "doc_query", "none") for next step if incomplete
-            }}
-            Return the JSON object, enclosed in ```json\n{{...}}\n```.
-            """
-        )
         try:
-            chain = prompt | self.llm | self.parser
-            completion_response = chain.invoke({
+            completion_response = (await self.completion_chain.ainvoke({
                 "query": state["query"],
                 "plan": json.dumps(state["plan"]),
-                "db_results": str(state["db_results"]) or "None",
+                "db_results": results_for_prompt(state["db_results"]),
                 "doc_results": state["document_results"] or "None"
-            }).strip()
+            })).strip()
             logger.info(f"Raw completion response: {completion_response}")
             # Find the first { and last } to extract the JSON content
             start_idx = completion_response.find("{")
@@ -211,31 +272,15 @@ class QueryAgent:
             print(f"Step: Completion check failed: {e}")
         return state
 
-    def _generate_final_response(self, state: AgentState) -> AgentState:
+    async def _generate_final_response(self, state: AgentState) -> AgentState:
         print("Step: Generating final response...")
         try:
-            schema = self.db_manager.get_schema()
-            prompt = ChatPromptTemplate.from_template(
-                """
-                You are a data analyst. Provide a concise, professional response to the query using outputs from all nodes.
-                - Use database results for numerical or factual answers.
-                - Include document information (1-2 sentences) if relevant.
-                - If incomplete (per completion status), note what's missing and suggest rephrasing.
-                - If an error occurred, explain it clearly using the error message in final_response.
-                Schema: {schema}
-                Query: {query}
-                Plan: {plan}
-                Database Results: {db_results}
-                Document Results: {doc_results}
-                Completion Status: {completion_status}
-                """
-            )
-            chain = prompt | self.llm | self.parser
-            state["final_response"] = chain.invoke({
+            schema = await asyncio.to_thread(self.db_manager.get_schema, state["query"])
+            state["final_response"] = await self.final_chain.ainvoke({
                 "schema": schema,
                 "query": state["query"],
                 "plan": json.dumps(state["plan"]),
-                "db_results": str(state["db_results"]) or "None",
+                "db_results": results_for_prompt(state["db_results"]),
                 "doc_results": state["document_results"] or "None",
                 "completion_status": json.dumps(state["completion_status"])
             })
@@ -247,18 +292,50 @@ class QueryAgent:
             print("Step: Response generation failed")
         return state
 
+    async def _query_database_branch(self, state: AgentState) -> dict:
+        """Parallel variant of _query_database that returns only the keys it owns, so it can run alongside the document branch."""
+        start = time.perf_counter()
+        result = await self._query_database(dict(state))
+        update = {key: result[key] for key in ("sql_query", "db_results", "final_response") if result.get(key) != state.get(key)}
+        update["branch_timings"] = {"query_database": (time.perf_counter() - start) * 1000}
+        return update
+
+    async def _query_documents_branch(self, state: AgentState) -> dict:
+        """Parallel variant of _query_documents."""
+        start = time.perf_counter()
+        result = await self._query_documents(dict(state))
+        return {
+            "document_results": result["document_results"],
+            "branch_timings": {"query_documents": (time.perf_counter() - start) * 1000},
+        }
+
+    def _route_plan(self, state: AgentState):
+        if is_parallel(state["plan"]):
+            print("Step: Querying database and documents in parallel...")
+            return ["query_database_branch", "query_documents_branch"]
+        return "query_database"
+
     def _build_workflow(self):
         workflow = StateGraph(AgentState)
         workflow.add_node("plan_query_strategy", self._plan_query_strategy)
         workflow.add_node("query_database", self._query_database)
         workflow.add_node("query_documents", self._query_documents)
+        workflow.add_node("query_database_branch", self._query_database_branch)
+        workflow.add_node("query_documents_branch", self._query_documents_branch)
         workflow.add_node("check_completion", self._check_completion)
         workflow.add_node("generate_final_response", self._generate_final_response)
 
         workflow.set_entry_point("plan_query_strategy")
-        workflow.add_edge("plan_query_strategy", "query_database")
+        # Independent hybrid plans fan out to both branches and join before
+        # check_completion; db_first/doc_first and single-source plans stay ordered.
+        workflow.add_conditional_edges(
+            "plan_query_strategy",
+            self._route_plan,
+            ["query_database", "query_database_branch", "query_documents_branch"]
+        )
         workflow.add_edge("query_database", "query_documents")
         workflow.add_edge("query_documents", "check_completion")
+        workflow.add_edge(["query_database_branch", "query_documents_branch"], "check_completion")
         workflow.add_conditional_edges(
             "check_completion",
             lambda state: state["completion_status"]["action"] if state.get("completion_status") else "none",
@@ -271,7 +348,7 @@ class QueryAgent:
         workflow.add_edge("generate_final_response", END)
         return workflow.compile()
 
-    def execute_query(self, query: str):
+    async def aexecute_query(self, query: str):
         print(f"\n=== Query: '{query}' ===")
         state = AgentState(
             query=query,
@@ -280,14 +357,85 @@ class QueryAgent:
             sql_query=None,
             db_results=None,
             final_response=None,
-            completion_status=None
+            completion_status=None,
+            branch_timings=None
         )
         try:
-            result = self.workflow.invoke(state)
+            result = await self.workflow.ainvoke(state)
+            self._log_savings(query, result.get("branch_timings"))
             print(f"\nFinal Answer: {result['final_response']}")
             print("=== Query Completed ===")
             return result["final_response"]
         except Exception as e:
             logger.error(f"Query execution failed: {e}")
             print("Step: Query execution failed")
-            return f"Error: Query execution failed: {str(e)}"
\ No newline at end of file
+            return f"Error: Query execution failed: {str(e)}"
+
+    def _log_savings(self, query: str, timings: Optional[dict]):
+        saved = parallel_savings_ms(timings)
+        if saved is not None:
+            logger.info(f"Parallel branches for '{query}': database {timings['query_database']:.0f} ms, documents {timings['query_documents']:.0f} ms, saved ~{saved:.0f} ms")
+
+    def _progress(self, node: str, state: dict) -> dict:
+        """Summarise a finished graph node for streaming clients."""
+        if node == "plan_query_strategy":
+            return {"node": node, "plan": state.get("plan")}
+        if node == "query_database":
+            results = state.get("db_results")
+            return {"node": node, "sql_query": state.get("sql_query"), "rows": results["row_count"] if results else None, "truncated": results["truncated"] if results else None}
+        if node == "query_documents":
+            return {"node": node, "document_results": state.get("document_results")}
+        if node == "query_database_branch":
+            return {**self._progress("query_database", state), "node": node}
+        if node == "query_documents_branch":
+            return {**self._progress("query_documents", state), "node": node}
+        if node == "check_completion":
+            progress = {"node": node, "completion_status": state.get("completion_status")}
+            saved = parallel_savings_ms(state.get("branch_timings"))
+            if saved is not None:
+                progress["parallel_saved_ms"] = round(saved, 1)
+            return progress
+        return {"node": node}
+
+    async def astream_query(self, query: str):
+        """Yield "progress" events as graph nodes finish, then "token" events for the final answer
+        and a closing "done" event carrying the full response."""
+        state = AgentState(
+            query=query,
+            plan=None,
+            document_results=None,
+            sql_query=None,
+            db_results=None,
+            final_response=None,
+            completion_status=None,
+            branch_timings=None
+        )
+        nodes = {"plan_query_strategy", "query_database", "query_documents", "query_database_branch", "query_documents_branch", "check_completion"}
+        final_response = None
+        streamed = False
+        try:
+            async for event in self.workflow.astream_events(state, version="v2"):
+                node = event.get("metadata", {}).get("langgraph_node")
+                if event["event"] == "on_chain_end" and event["name"] in nodes and event["name"] == node:
+                    yield {"event": "progress", "data": self._progress(node, event["data"].get("output") or {})}
+                elif event["event"] == "on_llm_stream" and node == "generate_final_response":
+                    chunk = event["data"]["chunk"]
+                    streamed = True
+                    yield {"event": "token", "data": {"text": getattr(chunk, "text", chunk)}}
+                elif event["event"] == "on_chain_end" and event["name"] == "generate_final_response" and node == "generate_final_response":
+                    output = event["data"].get("output") or {}
+                    final_response = output.get("final_response")
+                    self._log_savings(query, output.get("branch_timings"))
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            final_response = f"Error: Query execution failed: {str(e)}"
+            streamed = False
+        if final_response is None:
+            final_response = "Error: Query execution failed: no response generated"
+        if not streamed:
+            yield {"event": "token", "data": {"text": final_response}}
+        yield {"event": "done", "data": {"response": final_response}}
+
+    def execute_query(self, query: str):
+        """Synchronous entry point for scripts; request handlers should await aexecute_query."""
+        return asyncio.run(self.aexecute_query(query))
\ No newline at end of file
@@ -1,10 +1,15 @@
 from langchain.llms.base import LLM
+from langchain_core.outputs import GenerationChunk
 from langchain_core.embeddings import Embeddings
+import asyncio
+import httpx
 import requests
-import json
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional
 from pydantic import BaseModel, Field
-from config import CONFIG
+from config import CONFIG, logger
+from embedding_cache import get_embedding_cache
+from http_transport import http_transport
 
 class BedrockLanguageModelConfig(BaseModel):
     api_key: str = Field(..., description="API key for Bedrock service")
@@ -21,12 +26,32 @@ class BedrockLanguageModel(LLM, BedrockLanguageModelConfig):
             "prompt": prompt,
             "model_id": kwargs.get("model_id", self.model_id),
         }
-        headers = {"Content-Type": "application/json"}
-        response = requests.post(self.url, headers=headers, data=json.dumps(payload))
-        response.raise_for_status()
-        result = response.json()
+        result = http_transport.post_json(self.url, payload, operation="llm")
         return result["response"]["content"][0]["text"]
 
+    async def _acomplete(self, prompt: str, **kwargs) -> str:
+        payload = {
+            "api_key": self.api_key,
+            "prompt": prompt,
+            "model_id": kwargs.get("model_id", self.model_id),
+        }
+        result = await http_transport.apost_json(self.url, payload, operation="llm")
+        return result["response"]["content"][0]["text"]
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        text = await self._acomplete(prompt, **kwargs)
+        # Report the completion as a token so astream_events listeners see it inside graph nodes.
+        if run_manager:
+            await run_manager.on_llm_new_token(text)
+        return text
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> AsyncIterator[GenerationChunk]:
+        # The lambda endpoint returns the whole completion in one response, so it arrives as a single chunk.
+        chunk = GenerationChunk(text=await self._acomplete(prompt, **kwargs))
+        if run_manager:
+            await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+        yield chunk
+
     @property
     def _llm_type(self) -> str:
         return "bedrock_language_model"
@@ -35,11 +60,16 @@ class BedrockEmbeddingsConfig(BaseModel):
     api_key: str = Field(..., description="API key for Bedrock service")
     model_id: str = Field(default="amazon-embedding-v2", description="Model ID for embeddings")
     url: str = Field(default="https://quchnti6xu7yzw7hfzt5yjqtvi0kafsq.lambda-url.eu-central-1.on.aws/", description="API endpoint URL")
+    batch_size: int = Field(default=CONFIG["EMBEDDING_BATCH_SIZE"], description="Texts packed into one embedding request")
+    max_concurrency: int = Field(default=CONFIG["EMBEDDING_MAX_CONCURRENCY"], description="Embedding requests in flight at once")
 
 class BedrockEmbeddings(Embeddings, BedrockEmbeddingsConfig):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+    def _post(self, payload: dict) -> dict:
+        return http_transport.post_json(self.url, payload, operation="embedding")
+
     def embed_query(self, text: str) -> List[float]:
         """Generate embedding for a single text input."""
         payload = {
@@ -47,19 +77,112 @@ class BedrockEmbeddings(Embeddings, BedrockEmbeddingsConfig):
             "prompt": text,
             "model_id": self.model_id
         }
-        headers = {"Content-Type": "application/json"}
         try:
-            response = requests.post(self.url, headers=headers, data=json.dumps(payload))
-            response.raise_for_status()
-            result = response.json()
+            result = self._post(payload)
             return result["response"]["embedding"]
         except requests.exceptions.RequestException as e:
             raise ValueError(f"Error generating embedding: {str(e)}")
 
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of text inputs."""
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch in one request, falling back to per-text requests if the endpoint rejects lists."""
+        if len(texts) == 1:
+            return [self.embed_query(texts[0])]
+        payload = {
+            "api_key": self.api_key,
+            "prompt": texts,
+            "model_id": self.model_id
+        }
+        try:
+            embeddings = self._post(payload)["response"]["embeddings"]
+            if len(embeddings) == len(texts):
+                return embeddings
+            logger.warning(f"Batch embedding returned {len(embeddings)} vectors for {len(texts)} texts, falling back")
+        except (requests.exceptions.RequestException, KeyError, TypeError) as e:
+            logger.warning(f"Batch embedding not available, falling back to single requests: {e}")
         return [self.embed_query(text) for text in texts]
 
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for a list of text inputs, preserving input order.
+
+        Texts already present in the embedding cache are not sent to the endpoint.
+        """
+        if not texts:
+            return []
+        cache = get_embedding_cache()
+        if cache is None:
+            return self._embed_uncached(texts)
+        embeddings = cache.get_many(self.model_id, texts)
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if missing:
+            computed = dict(zip(missing, self._embed_uncached(missing)))
+            cache.put_many(self.model_id, missing, [computed[text] for text in missing])
+            embeddings = [computed[text] if embedding is None else embedding for text, embedding in zip(texts, embeddings)]
+        return embeddings
+
+    def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        batch_size = max(1, self.batch_size)
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        workers = max(1, min(self.max_concurrency, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(self._embed_batch, batches))
+        return [embedding for batch in results for embedding in batch]
+
+    async def _apost(self, payload: dict) -> dict:
+        return await http_transport.apost_json(self.url, payload, operation="embedding")
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Generate embedding for a single text input without blocking the event loop."""
+        payload = {
+            "api_key": self.api_key,
+            "prompt": text,
+            "model_id": self.model_id
+        }
+        try:
+            result = await self._apost(payload)
+            return result["response"]["embedding"]
+        except httpx.HTTPError as e:
+            raise ValueError(f"Error generating embedding: {str(e)}")
+
+    async def _aembed_batch(self, texts: List[str], semaphore: asyncio.Semaphore) -> List[List[float]]:
+        async with semaphore:
+            if len(texts) == 1:
+                return [await self.aembed_query(texts[0])]
+            payload = {
+                "api_key": self.api_key,
+                "prompt": texts,
+                "model_id": self.model_id
+            }
+            try:
+                embeddings = (await self._apost(payload))["response"]["embeddings"]
+                if len(embeddings) == len(texts):
+                    return embeddings
+                logger.warning(f"Batch embedding returned {len(embeddings)} vectors for {len(texts)} texts, falling back")
+            except (httpx.HTTPError, KeyError, TypeError) as e:
+                logger.warning(f"Batch embedding not available, falling back to single requests: {e}")
+            return [await self.aembed_query(text) for text in texts]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async counterpart of embed_documents, sharing the embedding cache."""
+        if not texts:
+            return []
+        cache = get_embedding_cache()
+        if cache is None:
+            return await self._aembed_uncached(texts)
+        embeddings = await asyncio.to_thread(cache.get_many, self.model_id, texts)
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if missing:
+            computed = dict(zip(missing, await self._aembed_uncached(missing)))
+            await asyncio.to_thread(cache.put_many, self.model_id, missing, [computed[text] for text in missing])
+            embeddings = [computed[text] if embedding is None else embedding for text, embedding in zip(texts, embeddings)]
+        return embeddings
+
+    async def _aembed_uncached(self, texts: List[str]) -> List[List[float]]:
+        batch_size = max(1, self.batch_size)
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        results = await asyncio.gather(*(self._aembed_batch(batch, semaphore) for batch in batches))
+        return [embedding for batch in results for embedding in batch]
+
     @property
     def _llm_type(self) -> str:
         return "bedrock_embeddings"
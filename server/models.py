@@ -1,21 +1,57 @@
 from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.engine import make_url
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from config import logger, CONFIG
-from sqlalchemy import create_engine
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import create_engine, event, Index
 
 Base = declarative_base()
 SQLITE_DB = CONFIG['SQLITE_DB']
 
-def get_db_session():
+def create_user_db_engine(url: str):
+    """Pooled engine for the users/sessions store; SQLite connections use WAL and a busy timeout."""
+    pool_options = {"pool_size": CONFIG["USER_DB_POOL_SIZE"], "max_overflow": CONFIG["USER_DB_MAX_OVERFLOW"], "pool_pre_ping": True}
+    if make_url(url).get_backend_name() != "sqlite":
+        return create_engine(url, echo=False, **pool_options)
+    busy_timeout_ms = CONFIG["USER_DB_BUSY_TIMEOUT_MS"]
+    engine = create_engine(
+        url,
+        echo=False,
+        connect_args={"check_same_thread": False, "timeout": busy_timeout_ms / 1000},
+        **pool_options,
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    return engine
+
+engine = create_user_db_engine(SQLITE_DB)
+SessionLocal = sessionmaker(bind=engine)
+
+def init_db():
+    """Create missing tables; called once at application startup."""
     try:
-        engine = create_engine(SQLITE_DB, echo=False)
         Base.metadata.create_all(engine)
-        Session = sessionmaker(bind=engine)
-        return Session()
+        # create_all() skips indexes on tables that already exist.
+        for index in UserSession.__table__.indexes:
+            index.create(engine, checkfirst=True)
+        logger.info("User database schema ready")
+    except Exception as e:
+        logger.error(f"Failed to create database schema: {e}", exc_info=True)
+        raise RuntimeError("Database initialization failed")
+
+def get_db_session():
+    """Return a new session on the shared engine; the caller must close it."""
+    try:
+        return SessionLocal()
     except Exception as e:
         logger.error(f"Failed to initialize database session: {e}", exc_info=True)
         raise RuntimeError("Database initialization failed")
@@ -44,6 +80,10 @@ class UserSession(Base):
     expires_at = Column(DateTime(timezone=True), nullable=False)  # Enable timezone support
     status = Column(String, nullable=False, default="active")  # active, expired
     user = relationship("User", back_populates="sessions")
+    __table_args__ = (
+        Index("ix_sessions_token_user_status", "token", "user_id", "status"),  # get_current_user lookup
+        Index("ix_sessions_status_expires_at", "status", "expires_at"),  # expiry sweeper
+    )
     
 class UserLog(Base):
     __tablename__ = "user_logs"
@@ -0,0 +1,158 @@
+import multiprocessing
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+from config import CONFIG, logger
+
+# Parsed documents kept by each pool worker, so a file is parsed once per worker, not once per page range.
+WORKER_DOCUMENT_CACHE_SIZE = 4
+
+class PdfExtractor(ABC):
+    """Base class for PDF text extraction backends."""
+    name = "base"
+
+    @abstractmethod
+    def open(self, file_path: str):
+        """Parse a PDF and return the backend's document object."""
+
+    def close(self, document):
+        pass
+
+    @abstractmethod
+    def count_pages(self, document) -> int:
+        ...
+
+    @abstractmethod
+    def extract_pages(self, document, start: int, end: int) -> str:
+        """Return the concatenated text of pages [start, end) of an opened document."""
+
+    def page_count(self, file_path: str) -> int:
+        document = self.open(file_path)
+        try:
+            return self.count_pages(document)
+        finally:
+            self.close(document)
+
+    def extract_range(self, file_path: str, start: int, end: int) -> str:
+        """Return the concatenated text of pages [start, end)."""
+        document = self.open(file_path)
+        try:
+            return self.extract_pages(document, start, end)
+        finally:
+            self.close(document)
+
+class PyPDF2Extractor(PdfExtractor):
+    name = "pypdf2"
+
+    def open(self, file_path: str):
+        from PyPDF2 import PdfReader
+        # PdfReader reads a path into memory, so no file handle stays open.
+        return PdfReader(file_path)
+
+    def count_pages(self, document) -> int:
+        return len(document.pages)
+
+    def extract_pages(self, document, start: int, end: int) -> str:
+        pages = document.pages
+        return "".join(pages[i].extract_text() or "" for i in range(start, min(end, len(pages))))
+
+class PyMuPDFExtractor(PdfExtractor):
+    """Backend using PyMuPDF (pip install pymupdf), typically several times faster than PyPDF2."""
+    name = "pymupdf"
+
+    def open(self, file_path: str):
+        import fitz
+        return fitz.open(file_path)
+
+    def close(self, document):
+        document.close()
+
+    def count_pages(self, document) -> int:
+        return document.page_count
+
+    def extract_pages(self, document, start: int, end: int) -> str:
+        return "".join(document[i].get_text() for i in range(start, min(end, document.page_count)))
+
+EXTRACTORS = {extractor.name: extractor for extractor in (PyPDF2Extractor, PyMuPDFExtractor)}
+
+def get_extractor(name: str = None) -> PdfExtractor:
+    name = name or CONFIG["PDF_EXTRACTOR"]
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown PDF extractor '{name}'. Available: {', '.join(EXTRACTORS)}")
+    return EXTRACTORS[name]()
+
+_worker_documents = OrderedDict()
+
+def _worker_document(backend: str, file_path: str):
+    """Return the extractor and parsed document for file_path, reusing this worker's cached parse."""
+    extractor = get_extractor(backend)
+    key = (backend, file_path)
+    document = _worker_documents.get(key)
+    if document is not None:
+        _worker_documents.move_to_end(key)
+        return extractor, document
+    document = extractor.open(file_path)
+    _worker_documents[key] = document
+    while len(_worker_documents) > WORKER_DOCUMENT_CACHE_SIZE:
+        (old_backend, _), old_document = _worker_documents.popitem(last=False)
+        get_extractor(old_backend).close(old_document)
+    return extractor, document
+
+def _page_count(backend: str, file_path: str) -> int:
+    extractor, document = _worker_document(backend, file_path)
+    return extractor.count_pages(document)
+
+def _extract_range(backend: str, file_path: str, start: int, end: int) -> str:
+    extractor, document = _worker_document(backend, file_path)
+    return extractor.extract_pages(document, start, end)
+
+def extract_texts(file_paths: List[str], backend: str = None, max_workers: int = None, pages_per_task: int = None) -> Dict[str, str]:
+    """Extract text from many PDFs, fanning page ranges of every file out over a process pool.
+
+    Workers are spawned rather than forked: this runs on ingestion threads of a threaded
+    server, and a forked child could inherit locks held by other threads.
+    Returns a mapping of file path to text; files that fail to parse map to "".
+    """
+    backend = backend or CONFIG["PDF_EXTRACTOR"]
+    max_workers = max_workers or CONFIG["PDF_EXTRACT_WORKERS"]
+    pages_per_task = max(1, pages_per_task or CONFIG["PDF_PAGES_PER_TASK"])
+    get_extractor(backend)
+    if not file_paths:
+        return {}
+    if max_workers <= 1 or (len(file_paths) == 1 and pages_per_task >= _safe_page_count(backend, file_paths[0], cached=False)):
+        return {path: _extract_file_inline(backend, path) for path in file_paths}
+
+    texts = {}
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        counts = dict(zip(file_paths, executor.map(_safe_page_count, [backend] * len(file_paths), file_paths)))
+        futures = {}
+        for path, count in counts.items():
+            futures[path] = [
+                executor.submit(_extract_range, backend, path, start, start + pages_per_task)
+                for start in range(0, count, pages_per_task)
+            ]
+        for path, parts in futures.items():
+            try:
+                texts[path] = "".join(part.result() for part in parts)
+            except Exception as e:
+                logger.error(f"Error extracting text from {path} with {backend}: {e}")
+                texts[path] = ""
+    return texts
+
+def _safe_page_count(backend: str, file_path: str, cached: bool = True) -> int:
+    try:
+        if not cached:
+            return get_extractor(backend).page_count(file_path)
+        return _page_count(backend, file_path)
+    except Exception as e:
+        logger.error(f"Error reading page count of {file_path} with {backend}: {e}")
+        return 0
+
+def _extract_file_inline(backend: str, file_path: str) -> str:
+    try:
+        extractor = get_extractor(backend)
+        return extractor.extract_range(file_path, 0, extractor.page_count(file_path))
+    except Exception as e:
+        logger.error(f"Error extracting text from {file_path} with {backend}: {e}")
+        return ""
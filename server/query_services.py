@@ -0,0 +1,92 @@
+import threading
+from typing import Optional
+from database import DatabaseManager
+from db_query import DatabaseQuery
+from doc_query import DocumentQuery
+from llm_agent import QueryAgent
+from llm_models import BedrockLanguageModel
+from vector_store_registry import vector_store_registry
+from config import CONFIG, logger
+
+class QueryServices:
+    """Process-wide query handlers shared by all requests.
+
+    The LLM client, the connected DatabaseManager and the handlers (with their
+    prompt chains and compiled workflow) are built once. Handlers that search
+    documents are kept per role and pointed at the role's current vector store on
+    every lookup, so a registry refresh is picked up without rebuilding them.
+    """
+
+    def __init__(self, db_uri: str):
+        self.db_uri = db_uri
+        self._llm = None
+        self._db_manager = None
+        self._database_query = None
+        self._agents = {}
+        self._document_queries = {}
+        self._lock = threading.RLock()
+
+    @property
+    def llm(self) -> BedrockLanguageModel:
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    self._llm = BedrockLanguageModel(api_key=CONFIG["ANTHROPIC_API_KEY"], model_id="claude-3.5-sonnet")
+        return self._llm
+
+    def db_manager(self) -> DatabaseManager:
+        """Return the shared DatabaseManager, connecting it on first use."""
+        if self._db_manager is None:
+            with self._lock:
+                if self._db_manager is None:
+                    db_manager = DatabaseManager(self.db_uri)
+                    db_manager.connect()
+                    self._db_manager = db_manager
+        return self._db_manager
+
+    def database_query(self) -> DatabaseQuery:
+        if self._database_query is None:
+            with self._lock:
+                if self._database_query is None:
+                    self._database_query = DatabaseQuery(self.db_manager(), llm=self.llm)
+        return self._database_query
+
+    def agent(self, role: str) -> QueryAgent:
+        vector_store = vector_store_registry.get(role)
+        agent = self._agents.get(role)
+        if agent is None:
+            with self._lock:
+                agent = self._agents.get(role)
+                if agent is None:
+                    agent = QueryAgent(self.db_manager(), vector_store, llm=self.llm)
+                    self._agents[role] = agent
+                    logger.info(f"Query agent created for role {role}")
+        agent.vector_store = vector_store
+        return agent
+
+    def document_query(self, role: str) -> DocumentQuery:
+        vector_store = vector_store_registry.get(role)
+        handler = self._document_queries.get(role)
+        if handler is None:
+            with self._lock:
+                handler = self._document_queries.get(role)
+                if handler is None:
+                    handler = DocumentQuery(vector_store, llm=self.llm)
+                    self._document_queries[role] = handler
+        handler.vector_store = vector_store
+        return handler
+
+    def stats(self) -> Optional[dict]:
+        """Database statistics, or None before the first connection."""
+        return self._db_manager.stats() if self._db_manager is not None else None
+
+    def warm_up(self):
+        """Connect the database and build every role's handlers ahead of the first request."""
+        self.database_query()
+        self.db_manager().get_schema()
+        for role in CONFIG["ROLES"]:
+            self.agent(role)
+            self.document_query(role)
+        logger.info(f"Query services ready for roles: {', '.join(CONFIG['ROLES'])}")
+
+query_services = QueryServices(CONFIG["DB_URI"])
@@ -0,0 +1,51 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+import numpy as np
+from database import format_results
+from config import CONFIG
+
+NUMERIC_TYPES = (int, float, Decimal)
+
+def _describe_column(name: str, values: np.ndarray, top_k: int) -> str:
+    present = values[values != None]  # noqa: E711 - elementwise comparison on an object array
+    nulls = len(values) - len(present)
+    if len(present) == 0:
+        return f"- {name}: all {nulls} values null"
+    if all(isinstance(v, NUMERIC_TYPES) and not isinstance(v, bool) for v in present):
+        numbers = present.astype("float64")
+        return (f"- {name} (numeric): min={numbers.min():.6g}, max={numbers.max():.6g}, "
+                f"mean={numbers.mean():.6g}, sum={numbers.sum():.10g}, nulls={nulls}")
+    if all(isinstance(v, (date, datetime)) for v in present):
+        return f"- {name} (date): min={present.min()}, max={present.max()}, nulls={nulls}"
+    labels, counts = np.unique(present.astype(str), return_counts=True)
+    order = np.argsort(-counts, kind="stable")[:top_k]
+    top = ", ".join(f"{labels[i]} ({counts[i]})" for i in order)
+    return f"- {name} (text): {len(labels)} distinct, nulls={nulls}, top values: {top}"
+
+def summarize_results(results: dict, top_k: Optional[int] = None, sample_rows: Optional[int] = None) -> str:
+    """Compact digest of a large result: row count, per-column statistics and a few sample rows."""
+    top_k = top_k or CONFIG["SQL_SUMMARY_TOP_K"]
+    sample_rows = sample_rows or CONFIG["SQL_SUMMARY_SAMPLE_ROWS"]
+    row_count = results["row_count"]
+    lines = [f"Result summary: {row_count} rows" + (" (truncated; statistics cover the fetched rows only)" if results["truncated"] else "")]
+    if row_count:
+        lines.append("Columns:")
+        for i, name in enumerate(results["columns"]):
+            column = np.fromiter((row[i] for row in results["rows"]), dtype=object, count=row_count)
+            lines.append(_describe_column(name, column, top_k))
+    sample = {"columns": results["columns"], "rows": results["rows"][:sample_rows], "row_count": min(row_count, sample_rows), "truncated": False}
+    lines.append(f"Sample rows ({sample['row_count']}):")
+    lines.append(format_results(sample))
+    return "\n".join(lines)
+
+def results_for_prompt(results: Optional[dict]) -> str:
+    """Rows as a table when small, otherwise a local summary, so prompt size stays bounded."""
+    if not results:
+        return "None"
+    if results["row_count"] > CONFIG["SQL_SUMMARY_ROW_THRESHOLD"]:
+        return summarize_results(results)
+    rendered = format_results(results)
+    if len(rendered) > CONFIG["SQL_SUMMARY_CHAR_THRESHOLD"]:
+        return summarize_results(results)
+    return rendered
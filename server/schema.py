@@ -33,4 +33,15 @@ class DatabaseQueryResponse(BaseModel):
 class DocumentUploadResponse(BaseModel):
     filename: str
     role: str
-    timestamp: datetime
\ No newline at end of file
+    timestamp: datetime
+    job_id: Optional[str] = None
+
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    role: str
+    filename: str
+    status: str
+    chunks_embedded: int
+    elapsed_seconds: float
+    created_at: datetime
+    error: Optional[str] = None
\ No newline at end of file
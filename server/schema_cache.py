@@ -0,0 +1,115 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+from config import logger
+
+class SchemaCache:
+    """Cached table DDL for a database, with relevance-based table selection.
+
+    The snapshot is read with one get_table_info() call per table and reused until
+    ttl seconds have passed or invalidate() is called. schema_for(query) returns
+    only the top_k tables whose descriptions are closest to the query, ranked by
+    embedding similarity, or by word overlap when embeddings are unavailable.
+    """
+
+    def __init__(self, db, ttl: int, top_k: int, embeddings=None, selection_cache_size: int = 256):
+        self.db = db
+        self.ttl = ttl
+        self.top_k = top_k
+        self.embeddings = embeddings
+        self._tables = {}
+        self._vectors = None
+        self._loaded_at = None
+        self._selections = OrderedDict()
+        self._selection_cache_size = selection_cache_size
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+        logger.info("Schema cache invalidated")
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def _load(self):
+        tables = {}
+        for name in self.db.get_usable_table_names():
+            tables[name] = self.db.get_table_info(table_names=[name])
+        vectors = None
+        if self.embeddings is not None and self.top_k and len(tables) > self.top_k:
+            try:
+                descriptions = [self._description(name, info) for name, info in tables.items()]
+                vectors = self._normalise(np.asarray(self.embeddings.embed_documents(descriptions), dtype="float32"))
+            except Exception as e:
+                logger.warning(f"Could not embed table descriptions, falling back to keyword matching: {e}")
+        self._tables = tables
+        self._vectors = vectors
+        self._selections.clear()
+        self._loaded_at = time.monotonic()
+        logger.info(f"Schema cache loaded with {len(tables)} tables")
+
+    def tables(self) -> dict:
+        """Return table name -> DDL, reloading the snapshot when it has expired."""
+        with self._lock:
+            if self._stale():
+                self._load()
+            return self._tables
+
+    @staticmethod
+    def _description(name: str, info: str) -> str:
+        # Sample rows follow the DDL inside /* */ and would only add noise.
+        return f"Table {name}: {info.split('/*')[0].strip()}"
+
+    @staticmethod
+    def _normalise(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    @staticmethod
+    def _words(text: str) -> set:
+        return {word for word in re.split(r"[^a-z0-9]+", text.lower()) if len(word) > 2}
+
+    def _rank(self, query: str, tables: dict) -> list:
+        names = list(tables)
+        if self._vectors is not None and len(self._vectors) == len(names):
+            try:
+                query_vector = self._normalise(np.asarray(self.embeddings.embed_query(query), dtype="float32"))
+                scores = self._vectors @ query_vector
+                return [names[i] for i in np.argsort(-scores)]
+            except Exception as e:
+                logger.warning(f"Query embedding failed, ranking tables by keyword overlap: {e}")
+        query_words = self._words(query)
+        return sorted(names, key=lambda name: -len(query_words & self._words(self._description(name, tables[name]))))
+
+    def select_tables(self, query: str) -> list:
+        tables = self.tables()
+        names = list(tables)
+        if not self.top_k or len(names) <= self.top_k:
+            return names
+        with self._lock:
+            selected = self._selections.get(query)
+            if selected is not None:
+                self._selections.move_to_end(query)
+                return selected
+        selected = self._rank(query, tables)[:self.top_k]
+        with self._lock:
+            self._selections[query] = selected
+            while len(self._selections) > self._selection_cache_size:
+                self._selections.popitem(last=False)
+        logger.info(f"Selected tables for '{query}': {selected}")
+        return selected
+
+    def schema_for(self, query: Optional[str] = None) -> str:
+        """Schema text for a prompt: every table, or only those relevant to query."""
+        tables = self.tables()
+        names = self.select_tables(query) if query else list(tables)
+        return "\n\n".join(tables[name] for name in names if name in tables)
+
+    def stats(self) -> dict:
+        with self._lock:
+            age = None if self._loaded_at is None else time.monotonic() - self._loaded_at
+            return {"tables": len(self._tables), "age_seconds": age, "ttl_seconds": self.ttl, "top_k": self.top_k, "cached_selections": len(self._selections)}
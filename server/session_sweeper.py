@@ -0,0 +1,106 @@
+import time
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+from sqlalchemy import select, update, delete
+from models import get_db_session, UserSession
+from config import CONFIG, logger
+
+class SessionSweeper:
+    """Marks expired sessions and purges old ones in bounded batches.
+
+    sweep_once() runs at startup; run() repeats it every interval seconds until stopped.
+    Each batch is its own short transaction so the auth path is never locked out for long.
+    """
+
+    def __init__(self, interval: float, batch_size: int, retention_days: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.retention_days = retention_days
+        self._stats = {"runs": 0, "expired": 0, "purged": 0, "last_run": None, "last_duration_ms": 0.0}
+        self._lock = threading.Lock()
+        self._task = None
+
+    def _in_batches(self, select_ids, apply) -> int:
+        total = 0
+        db = get_db_session()
+        try:
+            while True:
+                ids = db.execute(select_ids.limit(self.batch_size)).scalars().all()
+                if not ids:
+                    break
+                db.execute(apply.where(UserSession.session_id.in_(ids)))
+                db.commit()
+                total += len(ids)
+                if len(ids) < self.batch_size:
+                    break
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return total
+
+    def expire(self, now: datetime) -> int:
+        return self._in_batches(
+            select(UserSession.session_id).where(UserSession.status == "active", UserSession.expires_at < now),
+            update(UserSession).values(status="expired"),
+        )
+
+    def purge(self, now: datetime) -> int:
+        if not self.retention_days:
+            return 0
+        cutoff = now - timedelta(days=self.retention_days)
+        return self._in_batches(
+            select(UserSession.session_id).where(UserSession.status == "expired", UserSession.expires_at < cutoff),
+            delete(UserSession),
+        )
+
+    def sweep_once(self) -> dict:
+        start = time.perf_counter()
+        now = datetime.now(ZoneInfo("Asia/Kolkata"))
+        expired = self.expire(now)
+        purged = self.purge(now)
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["expired"] += expired
+            self._stats["purged"] += purged
+            self._stats["last_run"] = now
+            self._stats["last_duration_ms"] = (time.perf_counter() - start) * 1000
+        if expired or purged:
+            logger.info(f"Session sweep: {expired} expired, {purged} purged")
+        return {"expired": expired, "purged": purged}
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.sweep_once)
+            except Exception as e:
+                logger.error(f"Session sweep failed: {e}", exc_info=True)
+
+    def start(self) -> Optional[asyncio.Task]:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+session_sweeper = SessionSweeper(
+    interval=CONFIG["SESSION_SWEEP_INTERVAL"],
+    batch_size=CONFIG["SESSION_SWEEP_BATCH_SIZE"],
+    retention_days=CONFIG["SESSION_RETENTION_DAYS"],
+)
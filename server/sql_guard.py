@@ -0,0 +1,142 @@
+import re
+import json
+from config import CONFIG, logger
+
+class SQLRejectedError(ValueError):
+    """Raised when generated SQL is not allowed to run.
+
+    The message explains why, so it can be handed back to the LLM to write a better query.
+    """
+
+# Comments, string literals, quoted identifiers and dollar-quoted bodies, in that order.
+_LEXEMES = re.compile(r"--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\$(\w*)\$.*?\$\1\$", re.S)
+_TOKENS = re.compile(r"\(|\)|;|\w+")
+
+# Statements that write or change state. They are only rejected where a statement can begin,
+# so columns and aliases with these names (e.g. "cluster", "copy") stay usable.
+WRITE_STATEMENTS = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "UPSERT", "REPLACE", "DROP", "ALTER", "CREATE", "TRUNCATE",
+    "GRANT", "REVOKE", "COPY", "VACUUM", "REINDEX", "CLUSTER", "ATTACH", "DETACH", "PRAGMA",
+}
+ROW_LOCKS = re.compile(r"\bFOR\s+(NO\s+KEY\s+|KEY\s+)?(UPDATE|SHARE)\b", re.I)
+FORBIDDEN_FUNCTIONS = re.compile(
+    r"\b(pg_sleep\w*|pg_terminate_backend|pg_cancel_backend|pg_read_\w+|pg_ls_dir|lo_\w+|dblink\w*|set_config)\s*\(",
+    re.I,
+)
+
+def _strip_comments(sql: str) -> str:
+    return _LEXEMES.sub(lambda m: " " if m.group(0).startswith(("--", "/*")) else m.group(0), sql)
+
+def _mask_literals(sql: str) -> str:
+    # Same-length replacement keeps token offsets valid for the original sql.
+    def mask(match):
+        text = match.group(0)
+        if text.startswith(("--", "/*")):
+            return " " * len(text)
+        return " " + "_" * (len(text) - 2) + " "
+    return _LEXEMES.sub(mask, sql)
+
+def _top_level_tokens(sql: str):
+    """Yield the token matches of sql that are outside any parentheses."""
+    depth = 0
+    for match in _TOKENS.finditer(_mask_literals(sql)):
+        token = match.group(0)
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0:
+            yield match
+
+def _after_as(tokens: list, i: int) -> bool:
+    """True when the "(" at i opens a CTE body: WITH name AS [[NOT] MATERIALIZED] (...)."""
+    j = i - 1
+    while j >= 0 and tokens[j] in ("MATERIALIZED", "NOT"):
+        j -= 1
+    return j >= 0 and tokens[j] == "AS"
+
+def _statement_starts(tokens: list) -> list:
+    """Indexes of tokens that begin a statement: the first one, every CTE body and the
+    statement that follows a WITH list (which SQLite and Postgres allow to be a write)."""
+    first = next((i for i, token in enumerate(tokens) if token != "("), len(tokens))
+    starts = [first]
+    in_with_list = first < len(tokens) and tokens[first] == "WITH"
+    depth = first
+    for i in range(first, len(tokens)):
+        token = tokens[i]
+        if token == "(":
+            if _after_as(tokens, i):
+                starts.append(i + 1)
+            depth += 1
+        elif token == ")":
+            depth -= 1
+            following = tokens[i + 1] if i + 1 < len(tokens) else ""
+            if in_with_list and depth == first and following not in (",", "AS"):
+                starts.append(i + 1)
+                in_with_list = False
+    return [i for i in starts if i < len(tokens)]
+
+def _select_into(tokens: list) -> bool:
+    """True for SELECT ... INTO target, which creates a table; "into" as a column or alias is left alone."""
+    return any(
+        token == "INTO" and 0 < i < len(tokens) - 1 and tokens[i - 1] != "AS" and tokens[i + 1] not in ("FROM", ",", ")")
+        for i, token in enumerate(tokens)
+    )
+
+def validate_read_only(sql: str) -> str:
+    """Return sql without comments or a trailing semicolon if it is a single read-only SELECT.
+
+    Raises SQLRejectedError otherwise. Write statements are looked for where a statement
+    can begin (the start, CTE bodies and after a WITH list), outside string literals and
+    quoted identifiers. The read-only transaction in DatabaseManager remains the backstop.
+    """
+    cleaned = _strip_comments(sql).strip().rstrip(";").strip()
+    masked = _mask_literals(cleaned)
+    tokens = [token.upper() for token in _TOKENS.findall(masked)]
+    if not tokens:
+        raise SQLRejectedError("the statement is empty")
+    if ";" in tokens:
+        raise SQLRejectedError("only a single statement is allowed")
+    first = next((token for token in tokens if token != "("), "")
+    if first not in ("SELECT", "WITH"):
+        raise SQLRejectedError(f"only read-only SELECT queries are allowed, got {first}")
+    writes = sorted({tokens[i] for i in _statement_starts(tokens) if tokens[i] in WRITE_STATEMENTS})
+    if writes:
+        raise SQLRejectedError(f"the query contains write statements ({', '.join(writes)}); only SELECT is allowed")
+    if _select_into(tokens):
+        raise SQLRejectedError("SELECT ... INTO creates a table and is not allowed")
+    if ROW_LOCKS.search(masked):
+        raise SQLRejectedError("row-locking clauses (FOR UPDATE/FOR SHARE) are not allowed")
+    function = FORBIDDEN_FUNCTIONS.search(masked)
+    if function:
+        raise SQLRejectedError(f"the function {function.group(1)} is not allowed")
+    return cleaned
+
+def has_top_level_limit(sql: str) -> bool:
+    return any(match.group(0).upper() in ("LIMIT", "FETCH") for match in _top_level_tokens(sql))
+
+def ensure_limit(sql: str, limit: int) -> str:
+    """Add a LIMIT to the outermost query when it has none, ahead of a top-level OFFSET."""
+    if has_top_level_limit(sql):
+        return sql
+    offset = next((match for match in _top_level_tokens(sql) if match.group(0).upper() == "OFFSET"), None)
+    if offset is not None:
+        return f"{sql[:offset.start()]}LIMIT {int(limit)} {sql[offset.start():]}"
+    return f"{sql}\nLIMIT {int(limit)}"
+
+def check_plan(conn, sql: str):
+    """Reject a Postgres query whose EXPLAIN estimate exceeds the configured cost or row ceiling."""
+    max_cost, max_rows = CONFIG["SQL_MAX_PLAN_COST"], CONFIG["SQL_MAX_PLAN_ROWS"]
+    if not max_cost and not max_rows:
+        return
+    # no_parameters keeps the driver from reading "%" in LIKE patterns as placeholders.
+    plan = conn.execution_options(no_parameters=True).exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    plan = plan[0]["Plan"]
+    cost, rows = plan.get("Total Cost", 0), plan.get("Plan Rows", 0)
+    logger.info(f"SQL plan estimate: cost={cost}, rows={rows}")
+    if max_cost and cost > max_cost:
+        raise SQLRejectedError(f"the estimated cost {cost:.0f} exceeds the limit of {max_cost:.0f}; add selective filters or avoid cross joins")
+    if max_rows and rows > max_rows:
+        raise SQLRejectedError(f"the plan estimates {rows} rows, more than the limit of {max_rows}; aggregate or filter the data")
@@ -0,0 +1,19 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("ANTHROPIC_API_KEY", "test")
+
+@pytest.fixture
+def user_db(tmp_path, monkeypatch):
+    """Point models.get_db_session at a fresh SQLite users database."""
+    from sqlalchemy.orm import sessionmaker
+    import models
+    engine = models.create_user_db_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    models.Base.metadata.create_all(engine)
+    monkeypatch.setattr(models, "SessionLocal", sessionmaker(bind=engine))
+    yield engine
+    engine.dispose()
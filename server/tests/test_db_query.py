@@ -0,0 +1,31 @@
+import asyncio
+from langchain_core.runnables import RunnableLambda
+from config import CONFIG
+from database import format_results
+from db_query import DatabaseQuery
+
+RESULTS = {"columns": ["n", "city"], "rows": [(i, f"city{i % 7}") for i in range(500)], "row_count": 500, "truncated": False}
+
+class FakeDatabaseManager:
+    def get_schema(self, query=None):
+        return "t(n INTEGER, city TEXT)"
+
+    def execute_query(self, sql):
+        return RESULTS
+
+def make_query():
+    prompts = []
+    def llm(prompt):
+        prompts.append(prompt.to_string())
+        return "SELECT n, city FROM t" if len(prompts) % 2 else "answer"
+    return DatabaseQuery(FakeDatabaseManager(), llm=RunnableLambda(llm)), prompts
+
+def test_large_results_are_summarized_for_the_llm_only(monkeypatch):
+    monkeypatch.setitem(CONFIG, "SQL_SUMMARY_ROW_THRESHOLD", 50)
+    database_query, prompts = make_query()
+    for response in (database_query.execute_query("cities?"), asyncio.run(database_query.aexecute_query("cities?"))):
+        assert response["raw_response"] == format_results(RESULTS)
+        assert response["natural_language_response"] == "answer"
+    nl_prompts = prompts[1::2]
+    assert len(nl_prompts) == 2
+    assert all("Result summary: 500 rows" in prompt and "499\tcity2" not in prompt for prompt in nl_prompts)
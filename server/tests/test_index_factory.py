@@ -0,0 +1,42 @@
+import faiss
+import numpy as np
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from config import CONFIG
+from index_factory import build_vector_store, min_training_points, train_index
+
+ROLE = CONFIG["ROLES"][0]
+
+def texts(count: int) -> list:
+    return [f"document {n}" for n in range(count)]
+
+def index_type(store) -> type:
+    return type(faiss.downcast_index(store.index))
+
+@pytest.fixture
+def build(monkeypatch):
+    def build(factory: str, count: int):
+        monkeypatch.setitem(CONFIG, "ROLE_INDEX_SETTINGS", {ROLE: {"factory": factory}})
+        return build_vector_store(texts(count), [{"n": n} for n in range(count)], DeterministicFakeEmbedding(size=16), ROLE)
+    return build
+
+def test_too_few_vectors_fall_back_to_flat():
+    index = faiss.index_factory(16, "IVF4,Flat")
+    assert min_training_points(index) == 4 * 39
+    vectors = np.random.default_rng(0).random((100, 16), dtype="float32")
+    assert type(faiss.downcast_index(train_index("IVF4,Flat", vectors))) is faiss.IndexFlat
+
+def test_build_vector_store_falls_back_to_flat(build):
+    store = build("IVF4,Flat", 20)
+    assert index_type(store) is faiss.IndexFlat
+    assert store.similarity_search("document 7", k=1)[0].metadata == {"n": 7}
+
+@pytest.mark.parametrize("factory, expected", [("IVF4,Flat", faiss.IndexIVFFlat), ("HNSW32", faiss.IndexHNSWFlat)])
+def test_build_vector_store_uses_configured_index(build, factory, expected):
+    store = build(factory, 200)
+    assert index_type(store) is expected
+    assert store.index.ntotal == 200
+    results = store.similarity_search("document 123", k=3)
+    assert len(results) == 3
+    assert results[0].page_content == "document 123"
+    assert results[0].metadata == {"n": 123}
@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import pytest
+from langchain_community.embeddings import FakeEmbeddings
+from config import CONFIG
+from document_processor import DocumentProcessor
+from ingestion_manifest import MANIFEST_VERSION, IngestionManifest
+
+PDF_FOLDER = os.path.join(CONFIG["ROOT_DIR"], "dataset", "pdfs")
+PDFS = sorted(name for name in os.listdir(PDF_FOLDER) if name.endswith(".pdf"))
+ROLE = CONFIG["ROLES"][0]
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, "PROCESSED_DOCS_DIR", str(tmp_path / "processed"))
+    monkeypatch.setitem(CONFIG, "VECTOR_STORE_FORMAT", "pickle")
+    monkeypatch.setitem(CONFIG, "PDF_EXTRACT_WORKERS", 1)
+    embeddings = FakeEmbeddings(size=16)
+    monkeypatch.setattr(DocumentProcessor, "initialize_embeddings", lambda self: setattr(self, "embeddings_model", embeddings))
+    processor = DocumentProcessor(str(tmp_path / "pdfs"), ROLE)
+    hashed = []
+    compute_checksum = processor.compute_checksum
+    def counting_checksum(file_path):
+        hashed.append(os.path.basename(file_path))
+        return compute_checksum(file_path)
+    processor.compute_checksum = counting_checksum
+    processor.hashed = hashed
+    return processor
+
+def add_pdf(processor, index: int, name: str = None):
+    shutil.copy(os.path.join(PDF_FOLDER, PDFS[index]), os.path.join(processor.doc_folder, name or PDFS[index]))
+
+def ingest(processor) -> int:
+    processor.hashed.clear()
+    processor.chunks_embedded = 0
+    processor.process_documents()
+    return processor.chunks_embedded
+
+def test_unchanged_file_is_skipped_without_hashing(processor):
+    add_pdf(processor, 0)
+    assert ingest(processor) > 0
+    assert processor.hashed == [PDFS[0]]
+    ntotal = processor.vector_store.index.ntotal
+
+    assert ingest(processor) == 0
+    assert processor.hashed == []
+    assert processor.load_vector_store().index.ntotal == ntotal
+
+def test_modified_file_is_rehashed_and_reembedded(processor):
+    add_pdf(processor, 0, name="report.pdf")
+    ingest(processor)
+    ntotal = processor.vector_store.index.ntotal
+
+    add_pdf(processor, 1, name="report.pdf")
+    assert ingest(processor) > 0
+    assert processor.hashed == ["report.pdf"]
+    assert processor.load_vector_store().index.ntotal > ntotal
+    manifest = IngestionManifest.load(processor.metadata_path)
+    assert len(manifest.documents) == 2
+    assert len(manifest.files) == 1
+
+def test_legacy_manifest_is_migrated(processor):
+    add_pdf(processor, 0)
+    ingest(processor)
+    documents = IngestionManifest.load(processor.metadata_path).documents
+    with open(processor.metadata_path, "w", encoding="utf-8") as f:
+        json.dump(documents, f)
+
+    legacy = IngestionManifest.load(processor.metadata_path)
+    assert legacy.documents == documents
+    assert legacy.files == {}
+    assert legacy.dirty
+
+    # The legacy checksums are still honoured; the file is hashed once to fill in its stat entry.
+    assert ingest(processor) == 0
+    assert processor.hashed == [PDFS[0]]
+    with open(processor.metadata_path, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["version"] == MANIFEST_VERSION
+    assert data["documents"] == documents
+    assert len(data["files"]) == 1
+    assert ingest(processor) == 0
+    assert processor.hashed == []
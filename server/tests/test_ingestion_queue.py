@@ -0,0 +1,74 @@
+import threading
+import time
+import pytest
+import ingestion_queue
+from ingestion_queue import IngestionQueue
+
+class FakeRegistry:
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def ingest(self, role: str) -> int:
+        self.calls.append(role)
+        self.started.set()
+        assert self.release.wait(5)
+        return 10
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = FakeRegistry()
+    monkeypatch.setattr(ingestion_queue, "vector_store_registry", registry)
+    return registry
+
+@pytest.fixture
+def make_queue():
+    queues = []
+    def make(history: int = 100):
+        queues.append(IngestionQueue(max_workers=1, history=history))
+        return queues[-1]
+    yield make
+    for queue in queues:
+        queue.shutdown()
+
+def wait_until_finished(queue, job_ids):
+    deadline = time.monotonic() + 5
+    while any(queue.get(job_id)["status"] not in ("done", "failed") for job_id in job_ids):
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_queued_jobs_for_a_role_share_one_ingest_run(registry, make_queue):
+    queue = make_queue()
+    registry.release.clear()
+    first = queue.submit("hr", "a.pdf", 1)
+    assert registry.started.wait(5)
+    second = queue.submit("hr", "b.pdf", 1)
+    third = queue.submit("hr", "c.pdf", 2)
+    assert queue.get(second)["status"] == "queued"
+    assert queue.stats()["roles_pending"] == ["hr"]
+
+    registry.release.set()
+    wait_until_finished(queue, [first, second, third])
+    # The first job was already running; the two submitted behind it were coalesced.
+    assert registry.calls == ["hr", "hr"]
+    assert all(queue.get(job_id)["chunks_embedded"] == 10 for job_id in (first, second, third))
+
+def test_trim_keeps_at_most_history_finished_jobs(registry, make_queue):
+    queue = make_queue(history=2)
+    job_ids = []
+    for n in range(5):
+        job_ids.append(queue.submit("hr", f"{n}.pdf", 1))
+        wait_until_finished(queue, job_ids[-1:])
+    assert [queue.get(job_id) is not None for job_id in job_ids] == [False, False, False, True, True]
+    assert queue.stats()["jobs"] == {"done": 2}
+
+def test_trim_never_drops_unfinished_jobs(registry, make_queue):
+    queue = make_queue(history=1)
+    registry.release.clear()
+    job_ids = [queue.submit("hr", "a.pdf", 1)]
+    assert registry.started.wait(5)
+    job_ids += [queue.submit("finance", f"{n}.pdf", 1) for n in range(3)]
+    assert all(queue.get(job_id) is not None for job_id in job_ids)
+    registry.release.set()
@@ -0,0 +1,58 @@
+import uuid
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import pytest
+from sqlalchemy import event, select
+from models import UserSession, get_db_session
+from session_sweeper import SessionSweeper
+
+def add_sessions(count: int, status: str, expires_in: timedelta) -> set:
+    now = datetime.now(ZoneInfo("Asia/Kolkata"))
+    ids = {str(uuid.uuid4()) for _ in range(count)}
+    db = get_db_session()
+    db.add_all(UserSession(session_id=session_id, user_id=1, token=session_id, status=status, expires_at=now + expires_in) for session_id in ids)
+    db.commit()
+    db.close()
+    return ids
+
+def statuses() -> dict:
+    db = get_db_session()
+    try:
+        return dict(db.execute(select(UserSession.session_id, UserSession.status)).all())
+    finally:
+        db.close()
+
+@pytest.fixture
+def statements(user_db):
+    executed = []
+    @event.listens_for(user_db, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.split()[0].upper())
+    return executed
+
+def test_sweep_expires_and_purges_in_batches(statements):
+    newly_expired = add_sessions(7, "active", timedelta(hours=-1))
+    old = add_sessions(4, "expired", timedelta(days=-40))
+    recent = add_sessions(2, "expired", timedelta(days=-5))
+    active = add_sessions(3, "active", timedelta(hours=1))
+    statements.clear()
+
+    sweeper = SessionSweeper(interval=0, batch_size=3, retention_days=30)
+    assert sweeper.sweep_once() == {"expired": 7, "purged": 4}
+    assert statements.count("UPDATE") == 3
+    assert statements.count("DELETE") == 2
+
+    remaining = statuses()
+    assert old.isdisjoint(remaining)
+    assert {remaining[session_id] for session_id in newly_expired | recent} == {"expired"}
+    assert {remaining[session_id] for session_id in active} == {"active"}
+
+    assert sweeper.sweep_once() == {"expired": 0, "purged": 0}
+    assert sweeper.stats()["runs"] == 2
+    assert sweeper.stats()["expired"] == 7
+
+def test_purge_is_disabled_without_retention(user_db):
+    old = add_sessions(2, "expired", timedelta(days=-400))
+    sweeper = SessionSweeper(interval=0, batch_size=3, retention_days=0)
+    assert sweeper.sweep_once() == {"expired": 0, "purged": 0}
+    assert old <= set(statuses())
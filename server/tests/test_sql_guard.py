@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import create_engine
+from config import CONFIG
+from database import DatabaseManager
+import sqlite3
+from sql_guard import SQLRejectedError, validate_read_only, ensure_limit, check_plan
+
+PERCENT_QUERY = "SELECT name FROM cities WHERE name ILIKE '%kolkata%' OR name LIKE 'x%'"
+
+class FakePgConnection:
+    """Mimics psycopg2: with a parameter dict every "%" is a placeholder, without one the SQL is sent as is."""
+
+    def __init__(self):
+        self.options = {}
+        self.statements = []
+
+    def execution_options(self, **options):
+        self.options.update(options)
+        return self
+
+    def exec_driver_sql(self, sql):
+        if not self.options.get("no_parameters"):
+            sql = sql % {}
+        self.statements.append(sql)
+        return self
+
+    def scalar(self):
+        return [{"Plan": {"Total Cost": 10.0, "Plan Rows": 5}}]
+
+def test_validate_read_only_keeps_percent_literals():
+    assert validate_read_only(PERCENT_QUERY + ";") == PERCENT_QUERY
+
+def test_validate_read_only_rejects_writes():
+    with pytest.raises(SQLRejectedError):
+        validate_read_only("DELETE FROM cities WHERE name LIKE '%x%'")
+
+def test_check_plan_sends_percent_literals_unparameterised(monkeypatch):
+    monkeypatch.setitem(CONFIG, "SQL_MAX_PLAN_COST", 1000.0)
+    conn = FakePgConnection()
+    check_plan(conn, PERCENT_QUERY)
+    assert conn.statements == [f"EXPLAIN (FORMAT JSON) {PERCENT_QUERY}"]
+
+def test_execute_query_with_percent_literal(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, "SQL_GUARD_ENABLED", True)
+    db_uri = f"sqlite:///{tmp_path / 'cities.db'}"
+    engine = create_engine(db_uri)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE cities (name TEXT)")
+        conn.exec_driver_sql("INSERT INTO cities VALUES ('Kolkata'), ('Delhi'), ('x%y')")
+    engine.dispose()
+    manager = DatabaseManager(db_uri)
+    manager.db = object()
+    results = manager.execute_query("SELECT name FROM cities WHERE name LIKE '%kolkata%' OR name LIKE 'x%'")
+    assert sorted(row[0] for row in results["rows"]) == ["Kolkata", "x%y"]
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT n FROM t", "SELECT n FROM t\nLIMIT 3"),
+    ("SELECT n FROM t ORDER BY n OFFSET 2", "SELECT n FROM t ORDER BY n LIMIT 3 OFFSET 2"),
+    ("SELECT n FROM t ORDER BY n LIMIT 5 OFFSET 2", "SELECT n FROM t ORDER BY n LIMIT 5 OFFSET 2"),
+    ("SELECT n FROM (SELECT n FROM t LIMIT 9 OFFSET 1) AS s", "SELECT n FROM (SELECT n FROM t LIMIT 9 OFFSET 1) AS s\nLIMIT 3"),
+    ("SELECT n FROM t WHERE 'offset 1' <> '' OFFSET 1", "SELECT n FROM t WHERE 'offset 1' <> '' LIMIT 3 OFFSET 1"),
+])
+def test_ensure_limit(sql, expected):
+    limited = ensure_limit(sql, 3)
+    assert limited == expected
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (n INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(10)])
+    assert len(conn.execute(limited).fetchall()) <= 5
+
+@pytest.mark.parametrize("sql", [
+    "SELECT cluster, copy, merge, vacuum FROM jobs",
+    "SELECT a AS into, b AS delete, c AS update FROM t",
+    "SELECT max(cluster), count(copy) FROM jobs GROUP BY merge",
+    "SELECT * FROM (SELECT 1 AS n) cluster",
+    "WITH x(a) AS MATERIALIZED (SELECT 1 AS replace), y AS (SELECT 2) SELECT * FROM x, y",
+    "SELECT \"insert\", 'DELETE FROM t' FROM t",
+])
+def test_validate_read_only_allows_keyword_named_identifiers(sql):
+    assert validate_read_only(sql) == sql
+
+@pytest.mark.parametrize("sql", [
+    "WITH x AS (DELETE FROM t RETURNING *) SELECT * FROM x",
+    "WITH x AS NOT MATERIALIZED (UPDATE t SET a = 1 RETURNING a) SELECT * FROM x",
+    "WITH x AS (SELECT 1) DELETE FROM t",
+    "WITH x(a) AS (SELECT 1) INSERT INTO t SELECT * FROM x",
+    "SELECT * INTO TEMP copy_of_t FROM t",
+    "SELECT * FROM t FOR UPDATE",
+    "SELECT 1; DROP TABLE t",
+])
+def test_validate_read_only_rejects_writes_in_keyword_positions(sql):
+    with pytest.raises(SQLRejectedError):
+        validate_read_only(sql)
@@ -0,0 +1,87 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import pytest
+import api_utils
+import token_cache
+from models import User, UserSession, get_db_session
+from token_cache import MemoryTokenCache
+
+USER = {"id": 1, "username": "alice", "role": "hr"}
+
+def expires_in(seconds: int) -> datetime:
+    return datetime.now(ZoneInfo("Asia/Kolkata")) + timedelta(seconds=seconds)
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(token_cache.time, "monotonic", lambda: now[0])
+    return now
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = MemoryTokenCache(ttl=60, max_entries=100)
+    monkeypatch.setattr(api_utils, "get_token_cache", lambda: cache)
+    return cache
+
+def test_second_validation_is_served_from_cache(user_db, cache):
+    db = get_db_session()
+    db.add(User(id=1, email="alice@example.com", name="Alice", username="alice", password="x", role="hr"))
+    db.commit()
+    token, expires_at = api_utils.create_access_token(USER)
+    db.add(UserSession(session_id=str(uuid.uuid4()), user_id=1, token=token, expires_at=expires_at))
+    db.commit()
+
+    assert asyncio.run(api_utils.get_current_user(token, db)) == USER
+    assert cache.stats()["misses"] == 1
+    db.close()
+    # No database session: the second validation can only succeed from the cache.
+    assert asyncio.run(api_utils.get_current_user(token, None)) == USER
+    assert cache.stats()["hits"] == 1
+
+def test_entry_expires_after_ttl(clock):
+    cache = MemoryTokenCache(ttl=60, max_entries=100)
+    cache.set("token", USER, expires_in(3600))
+    clock[0] += 59
+    assert cache.get("token") == USER
+    clock[0] += 2
+    assert cache.get("token") is None
+    assert cache.stats()["entries"] == 0
+
+def test_entry_never_outlives_the_session(clock):
+    cache = MemoryTokenCache(ttl=60, max_entries=100)
+    cache.set("token", USER, expires_in(10))
+    clock[0] += 11
+    assert cache.get("token") is None
+    cache.set("expired", USER, expires_in(-1))
+    assert cache.stats()["entries"] == 0
+
+def test_revoke_user_drops_all_of_their_tokens():
+    cache = MemoryTokenCache(ttl=60, max_entries=100)
+    cache.set("laptop", USER, expires_in(3600))
+    cache.set("phone", USER, expires_in(3600))
+    cache.set("other", {"id": 2, "username": "bob", "role": "hr"}, expires_in(3600))
+    cache.revoke_user(USER["id"])
+    assert cache.get("laptop") is None
+    assert cache.get("phone") is None
+    assert cache.get("other")["id"] == 2
+
+def test_delete_drops_a_single_token():
+    cache = MemoryTokenCache(ttl=60, max_entries=100)
+    cache.set("token", USER, expires_in(3600))
+    cache.delete("token")
+    assert cache.get("token") is None
+
+def test_memory_backend_evicts_least_recently_used():
+    cache = MemoryTokenCache(ttl=60, max_entries=2)
+    cache.set("a", USER, expires_in(3600))
+    cache.set("b", USER, expires_in(3600))
+    cache.get("a")
+    cache.set("c", USER, expires_in(3600))
+    assert cache.stats()["entries"] == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == USER
+    assert cache.get("c") == USER
+    cache.revoke_user(USER["id"])
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,69 @@
+import gc
+import os
+import shutil
+import sqlite3
+import pytest
+from langchain_community.embeddings import FakeEmbeddings
+from config import CONFIG
+from document_processor import DocumentProcessor
+from vector_store_registry import VectorStoreRegistry
+
+PDF_FOLDER = os.path.join(CONFIG["ROOT_DIR"], "dataset", "pdfs")
+ROLE = CONFIG["ROLES"][0]
+
+@pytest.fixture(params=["pickle", "compact"])
+def doc_folder(request, tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, "PROCESSED_DOCS_DIR", str(tmp_path / "processed"))
+    monkeypatch.setitem(CONFIG, "VECTOR_STORE_FORMAT", request.param)
+    monkeypatch.setitem(CONFIG, "UNIFIED_INDEX", False)
+    monkeypatch.setitem(CONFIG, "PDF_EXTRACT_WORKERS", 1)
+    embeddings = FakeEmbeddings(size=16)
+    monkeypatch.setattr(DocumentProcessor, "initialize_embeddings", lambda self: setattr(self, "embeddings_model", embeddings))
+    folder = tmp_path / "pdfs"
+    (folder / ROLE).mkdir(parents=True)
+    return folder
+
+def add_pdf(folder, index: int):
+    name = sorted(name for name in os.listdir(PDF_FOLDER) if name.endswith(".pdf"))[index]
+    shutil.copy(os.path.join(PDF_FOLDER, name), folder / ROLE / name)
+
+def test_get_reloads_index_written_by_another_registry(doc_folder):
+    reader = VectorStoreRegistry(str(doc_folder))
+    writer = VectorStoreRegistry(str(doc_folder))
+    add_pdf(doc_folder, 0)
+    writer.ingest(ROLE)
+    first = reader.get(ROLE)
+    assert reader.get(ROLE) is first
+
+    add_pdf(doc_folder, 1)
+    assert writer.ingest(ROLE) > 0
+    second = reader.get(ROLE)
+    assert second is not first
+    assert second.index.ntotal > first.index.ntotal
+    assert second.index.ntotal == writer.get(ROLE).index.ntotal
+    assert reader.get(ROLE) is second
+
+def test_ingest_registers_store_without_reload(doc_folder):
+    registry = VectorStoreRegistry(str(doc_folder))
+    add_pdf(doc_folder, 0)
+    registry.ingest(ROLE)
+    assert registry.get(ROLE) is registry.get(ROLE)
+
+def test_replaced_compact_store_closes_its_docstore(doc_folder):
+    if CONFIG["VECTOR_STORE_FORMAT"] != "compact":
+        pytest.skip("only compact stores hold an SQLite connection")
+    reader = VectorStoreRegistry(str(doc_folder))
+    writer = VectorStoreRegistry(str(doc_folder))
+    add_pdf(doc_folder, 0)
+    writer.ingest(ROLE)
+    first = reader.get(ROLE)
+    connection = first.docstore._reader._conn
+    connection.execute("SELECT 1")
+
+    add_pdf(doc_folder, 1)
+    writer.ingest(ROLE)
+    assert reader.get(ROLE) is not first
+    del first
+    gc.collect()
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute("SELECT 1")
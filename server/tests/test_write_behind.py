@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+import pytest
+from sqlalchemy import func, select
+from models import UserLog
+from write_behind import WriteBehindQueue
+
+@pytest.fixture
+def make_queue(user_db):
+    queues = []
+    def make(**options):
+        options = {"max_size": 100, "batch_size": 1000, "flush_interval": 60.0, "put_timeout": 1.0, **options}
+        queues.append(WriteBehindQueue(**options))
+        return queues[-1]
+    yield make
+    for write_queue in queues:
+        write_queue.shutdown(timeout=5)
+
+def row(n: int) -> dict:
+    return {"user_id": 1, "client_ip": f"10.0.0.{n}"}
+
+def stored_rows(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(UserLog)).scalar()
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_flushes_when_batch_size_rows_are_waiting(make_queue, user_db):
+    write_queue = make_queue(batch_size=3)
+    for n in range(4):
+        write_queue.put(UserLog, row(n))
+    wait_for(lambda: write_queue.stats()["written"] == 3)
+    time.sleep(0.2)
+    assert stored_rows(user_db) == 3
+    assert write_queue.stats()["batches"] == 1
+
+def test_flushes_partial_batch_after_interval(make_queue, user_db):
+    write_queue = make_queue(flush_interval=0.1)
+    for n in range(3):
+        write_queue.put(UserLog, row(n))
+    wait_for(lambda: stored_rows(user_db) == 3)
+    assert write_queue.stats()["batches"] == 1
+
+def test_full_buffer_falls_back_to_a_direct_write(make_queue, user_db):
+    write_queue = make_queue(max_size=2, batch_size=1, put_timeout=0.05)
+    flushing = threading.Event()
+    release = threading.Event()
+    flush = write_queue._flush
+    def blocked_flush(items):
+        flushing.set()
+        release.wait(5)
+        flush(items)
+    write_queue._flush = blocked_flush
+
+    write_queue.put(UserLog, row(0))
+    assert flushing.wait(5)
+    for n in range(1, 4):
+        write_queue.put(UserLog, row(n))
+    # The writer is stuck on row 0 and rows 1-2 fill the buffer, so row 3 is written by the producer.
+    assert write_queue.stats()["direct_writes"] == 1
+    assert stored_rows(user_db) == 1
+
+    release.set()
+    write_queue.shutdown(timeout=5)
+    assert stored_rows(user_db) == 4
+    assert write_queue.stats()["enqueued"] == 3
+
+def test_shutdown_drains_every_buffered_row(make_queue, user_db):
+    write_queue = make_queue()
+    for n in range(200):
+        write_queue.put(UserLog, row(n))
+    for n in range(200, 250):
+        asyncio.run(write_queue.aput(UserLog, row(n)))
+    assert stored_rows(user_db) == 0
+    write_queue.shutdown(timeout=5)
+    assert stored_rows(user_db) == 250
+    stats = write_queue.stats()
+    assert stats["written"] == 250
+    assert stats["failed_rows"] == 0
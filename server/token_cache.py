@@ -0,0 +1,161 @@
+import json
+import time
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+from zoneinfo import ZoneInfo
+from config import CONFIG, logger
+
+def _key(token: str) -> str:
+    # Tokens are stored hashed so the cache (or a shared backend) never holds usable credentials.
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _ttl_seconds(ttl: int, expires_at: datetime) -> float:
+    return min(ttl, (expires_at - datetime.now(ZoneInfo("Asia/Kolkata"))).total_seconds())
+
+class TokenCache(ABC):
+    """Cache of validated access tokens: token -> user dict, bounded by a TTL and the session expiry."""
+
+    @abstractmethod
+    def get(self, token: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def set(self, token: str, user: dict, expires_at: datetime):
+        ...
+
+    @abstractmethod
+    def delete(self, token: str):
+        ...
+
+    @abstractmethod
+    def revoke_user(self, user_id: int):
+        """Drop every cached token of a user, e.g. on logout."""
+
+    def stats(self) -> dict:
+        return {}
+
+class MemoryTokenCache(TokenCache):
+    """Per-process LRU cache. Revocations are only seen by the worker that made them;
+    other workers keep serving a revoked token for at most ttl seconds."""
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            tokens = self._by_user.get(entry["user"]["id"])
+            if tokens is not None:
+                tokens.discard(key)
+                if not tokens:
+                    del self._by_user[entry["user"]["id"]]
+
+    def get(self, token: str) -> Optional[dict]:
+        key = _key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["deadline"] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry["user"]
+
+    def set(self, token: str, user: dict, expires_at: datetime):
+        ttl = _ttl_seconds(self.ttl, expires_at)
+        if ttl <= 0:
+            return
+        key = _key(token)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = {"user": user, "deadline": time.monotonic() + ttl}
+            self._by_user.setdefault(user["id"], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, token: str):
+        with self._lock:
+            self._remove(_key(token))
+
+    def revoke_user(self, user_id: int):
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {"backend": "memory", "entries": len(self._entries), "hits": self._hits, "misses": self._misses,
+                    "hit_rate": self._hits / total if total else 0.0}
+
+class RedisTokenCache(TokenCache):
+    """Shared cache in Redis, so every worker sees a logout immediately. Requires the redis package."""
+
+    def __init__(self, url: str, ttl: int, prefix: str = "llm_agent:token:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("TOKEN_CACHE_BACKEND=redis requires the 'redis' package") from e
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.prefix}user:{user_id}"
+
+    def get(self, token: str) -> Optional[dict]:
+        value = self.client.get(self.prefix + _key(token))
+        return json.loads(value) if value else None
+
+    def set(self, token: str, user: dict, expires_at: datetime):
+        ttl = int(_ttl_seconds(self.ttl, expires_at))
+        if ttl <= 0:
+            return
+        key = self.prefix + _key(token)
+        pipe = self.client.pipeline()
+        pipe.set(key, json.dumps(user), ex=ttl)
+        pipe.sadd(self._user_key(user["id"]), key)
+        pipe.expire(self._user_key(user["id"]), self.ttl)
+        pipe.execute()
+
+    def delete(self, token: str):
+        self.client.delete(self.prefix + _key(token))
+
+    def revoke_user(self, user_id: int):
+        user_key = self._user_key(user_id)
+        keys = self.client.smembers(user_key)
+        self.client.delete(user_key, *keys)
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+def get_token_cache() -> Optional[TokenCache]:
+    """Return the configured token cache, or None when TOKEN_CACHE_BACKEND is "none"."""
+    global _token_cache
+    backend = CONFIG["TOKEN_CACHE_BACKEND"]
+    if backend == "none":
+        return None
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                if backend == "redis":
+                    _token_cache = RedisTokenCache(CONFIG["TOKEN_CACHE_REDIS_URL"], CONFIG["TOKEN_CACHE_TTL"])
+                else:
+                    _token_cache = MemoryTokenCache(CONFIG["TOKEN_CACHE_TTL"], CONFIG["TOKEN_CACHE_MAX_ENTRIES"])
+                logger.info(f"Token cache initialized with the {backend} backend")
+    return _token_cache
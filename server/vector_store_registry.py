@@ -0,0 +1,107 @@
+import os
+import threading
+from document_processor import DocumentProcessor, UnifiedDocumentProcessor, RoleFilteredVectorStore, UNIFIED_INDEX_NAME, index_path_for, index_version
+from config import CONFIG, logger
+
+class VectorStoreRegistry:
+    """Process-wide cache of per-role vector stores shared by all requests.
+
+    With CONFIG["UNIFIED_INDEX"] enabled a single shared index is cached and each
+    role receives a RoleFilteredVectorStore view over it. Each cached store records the
+    version of the index directory it was loaded from; get() reloads it when another
+    worker or process has saved a newer index.
+    """
+
+    def __init__(self, doc_folder: str):
+        self.doc_folder = doc_folder
+        self._stores = {}
+        self._versions = {}
+        self._lock = threading.RLock()
+        self._role_locks = {}
+
+    def _role_lock(self, key: str):
+        with self._lock:
+            if key not in self._role_locks:
+                self._role_locks[key] = threading.Lock()
+            return self._role_locks[key]
+
+    def _key(self, role: str) -> str:
+        return UNIFIED_INDEX_NAME if CONFIG["UNIFIED_INDEX"] else role
+
+    def _processor(self, key: str):
+        if key == UNIFIED_INDEX_NAME:
+            return UnifiedDocumentProcessor(self.doc_folder)
+        return DocumentProcessor(self.doc_folder, key)
+
+    def _view(self, store, role: str):
+        if store is None or not CONFIG["UNIFIED_INDEX"]:
+            return store
+        return RoleFilteredVectorStore(store, role)
+
+    def _current(self, key: str):
+        """The cached store for key, or None when missing or older than the index on disk."""
+        store = self._stores.get(key)
+        if store is not None and self._versions.get(key) == index_version(index_path_for(key)):
+            return store
+        return None
+
+    def _register(self, key: str, doc_processor):
+        self._stores[key] = doc_processor.vector_store
+        self._versions[key] = doc_processor.index_version
+
+    def get(self, role: str):
+        """Return the vector store for a role, loading it from disk on first use or after the index changed."""
+        key = self._key(role)
+        store = self._current(key)
+        if store is not None:
+            return self._view(store, role)
+        with self._role_lock(key):
+            store = self._current(key)
+            if store is not None:
+                return self._view(store, role)
+            try:
+                reload = key in self._stores
+                doc_processor = self._processor(key)
+                doc_processor.initialize_embeddings()
+                store = doc_processor.load_vector_store(read_only=True)
+                if store is not None:
+                    self._register(key, doc_processor)
+                    logger.info(f"Vector store {'reloaded' if reload else 'registered'} for {key}")
+                return self._view(store, role)
+            except Exception as e:
+                logger.error(f"Error loading vector store into registry for {key}: {e}")
+                raise
+
+    def _refresh(self, key: str):
+        with self._role_lock(key):
+            try:
+                doc_processor = self._processor(key)
+                store = doc_processor.process_documents()
+                if store is not None:
+                    self._register(key, doc_processor)
+                    logger.info(f"Vector store refreshed for {key}")
+                return doc_processor
+            except Exception as e:
+                logger.error(f"Error refreshing vector store for {key}: {e}")
+                raise
+
+    def refresh(self, role: str):
+        """Ingest any new documents for a role and hot-swap the cached vector store."""
+        return self._view(self._refresh(self._key(role)).vector_store, role)
+
+    def ingest(self, role: str) -> int:
+        """Like refresh(), but return the number of chunks embedded."""
+        return self._refresh(self._key(role)).chunks_embedded
+
+    def invalidate(self, role: str = None):
+        """Drop a cached vector store (or all of them) so the next get() reloads from disk."""
+        with self._lock:
+            if role is None:
+                self._stores.clear()
+                self._versions.clear()
+            else:
+                self._stores.pop(self._key(role), None)
+                self._versions.pop(self._key(role), None)
+        logger.info(f"Vector store registry invalidated for {'all roles' if role is None else f'role {role}'}")
+
+vector_store_registry = VectorStoreRegistry(os.path.join(CONFIG["ROOT_DIR"], "dataset", "pdfs"))
@@ -0,0 +1,130 @@
+import time
+import queue
+import asyncio
+import threading
+from collections import deque
+from sqlalchemy import insert
+from models import get_db_session
+from config import CONFIG, logger
+
+_STOP = object()
+
+class WriteBehindQueue:
+    """Buffers audit rows (ChatHistory, UserLog) and inserts them in batches on a background thread.
+
+    Rows are flushed when batch_size are waiting or flush_interval seconds have
+    passed. The buffer holds at most max_size rows; when it is full, producers wait
+    up to put_timeout seconds and then write their row directly, so nothing is lost.
+    """
+
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float, put_timeout: float, window: int = 1000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_size)
+        self._counters = {"enqueued": 0, "written": 0, "batches": 0, "failed_rows": 0, "direct_writes": 0}
+        self._flush_latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def put(self, model, values: dict):
+        """Queue one row for model; blocks up to put_timeout when the buffer is full."""
+        try:
+            self._queue.put((model, values), timeout=self.put_timeout)
+            self._count("enqueued")
+        except queue.Full:
+            logger.warning(f"Write-behind buffer full, writing {model.__tablename__} row directly")
+            self._count("direct_writes")
+            self._write([(model, values)])
+
+    async def aput(self, model, values: dict):
+        """Async variant of put(); only leaves the event loop when the buffer is full."""
+        try:
+            self._queue.put_nowait((model, values))
+            self._count("enqueued")
+        except queue.Full:
+            await asyncio.to_thread(self.put, model, values)
+
+    def _write(self, items: list):
+        grouped = {}
+        for model, values in items:
+            grouped.setdefault(model, []).append(values)
+        db = get_db_session()
+        try:
+            for model, rows in grouped.items():
+                db.execute(insert(model), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _flush(self, items: list):
+        start = time.perf_counter()
+        for attempt in range(3):
+            try:
+                self._write(items)
+                break
+            except Exception as e:
+                logger.error(f"Write-behind flush of {len(items)} rows failed (attempt {attempt + 1}): {e}", exc_info=True)
+                time.sleep(0.1 * (attempt + 1))
+        else:
+            self._count("failed_rows", len(items))
+            return
+        with self._lock:
+            self._counters["written"] += len(items)
+            self._counters["batches"] += 1
+            self._flush_latencies.append(time.perf_counter() - start)
+
+    def _run(self):
+        items = []
+        deadline = None
+        stopping = False
+        while not stopping:
+            timeout = self.flush_interval if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+                if item is _STOP:
+                    stopping = True
+                else:
+                    items.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+            except queue.Empty:
+                pass
+            if items and (stopping or len(items) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(items)
+                items = []
+                deadline = None
+
+    def shutdown(self, timeout: float = 30.0):
+        """Flush everything still buffered and stop the writer thread."""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        logger.info(f"Write-behind queue stopped: {self.stats()}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._flush_latencies)
+            def percentile(p):
+                return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+            return {
+                "depth": self._queue.qsize(),
+                "max_size": self._queue.maxsize,
+                **self._counters,
+                "flush_p50_ms": percentile(0.50),
+                "flush_p95_ms": percentile(0.95),
+            }
+
+audit_queue = WriteBehindQueue(
+    max_size=CONFIG["AUDIT_QUEUE_MAX_SIZE"],
+    batch_size=CONFIG["AUDIT_QUEUE_BATCH_SIZE"],
+    flush_interval=CONFIG["AUDIT_QUEUE_FLUSH_INTERVAL"],
+    put_timeout=CONFIG["AUDIT_QUEUE_PUT_TIMEOUT"],
+)